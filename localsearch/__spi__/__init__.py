@@ -2,7 +2,9 @@ from .model import Document
 from .model import Documents
 from .model import IndexedDocument
 from .model import ScoredDocument
+from .types import Cache
 from .types import Encoder
+from .types import Fusion
 from .types import Lang
 from .types import Reader
 from .types import Traverser
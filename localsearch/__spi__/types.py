@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Union, Literal, Protocol, Sized, Optional, Tuple
+from typing import Any, Callable, Hashable, List, Union, Literal, Protocol, Sized, Optional, Tuple
 
 from localsearch.__spi__ import Document, ScoredDocument
 
@@ -10,6 +10,19 @@ class Reader(Protocol):
     def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
         pass
 
+    def read_batch(self, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+        return [self.read(text, n) for text in texts]
+
+
+def read_batch(reader: Reader, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+    """
+    Calls read_batch of the reader. Duck-typed readers which only implement read are called once per text.
+    """
+    batch = getattr(reader, "read_batch", None)
+    if batch is None:
+        return [reader.read(text, n) for text in texts]
+    return batch(texts, n)
+
 
 class Writer(Protocol):
 
@@ -44,7 +57,7 @@ class Traverser(ABC):
         pass
 
     @abstractmethod
-    def get_edges(self, node_id: str):
+    def get_edges(self, node_id: str, edge_type: Optional[str] = None):
         pass
 
     @abstractmethod
@@ -55,6 +68,9 @@ class Traverser(ABC):
     def search_by_id(self, node_id: str):
         pass
 
+    def search_by_ids(self, node_ids: List[str]):
+        return [self.search_by_id(e) for e in node_ids]
+
 
 class Vector(Protocol, Sized):
     def __getitem__(self, __index: int) -> float: ...
@@ -78,6 +94,35 @@ class CrossEncoder(Protocol):
         pass
 
 
+class Cache(Protocol):
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def put(self, key: Hashable, value: Any):
+        pass
+
+    @abstractmethod
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]):
+        pass
+
+    def delete(self, key: Hashable):
+        self.invalidate(lambda k, _: k == key)
+
+
+class Fusion(Protocol):
+
+    @abstractmethod
+    def __call__(self, results: List[List[ScoredDocument]], n: Optional[int] = None) -> List[ScoredDocument]:
+        """
+        Merges the ranked results of multiple readers into a single ranking of unique documents, the score of the
+        returned documents is the fused score.
+        """
+        pass
+
+
 Lang = Literal["de", "en"]
 
 
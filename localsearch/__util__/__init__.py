@@ -1,2 +1,2 @@
-from .array_utils import cosine_similarity, unique, flatten, sort
+from .array_utils import cosine_similarity, unique, flatten, sort, top_k, take_unique
 from .io_utils import write_json, read_json
\ No newline at end of file
@@ -1,4 +1,6 @@
-from typing import List, Dict
+import heapq
+from itertools import islice
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, TypeVar
 
 import numpy as np
 from numpy import matmul
@@ -6,6 +8,8 @@ from numpy.linalg import norm
 
 from localsearch import ScoredDocument
 
+T = TypeVar("T")
+
 
 def cosine_similarity(a, b) -> float:
     a = np.expand_dims(a, axis=0) if len(a.shape) == 1 else a
@@ -17,28 +21,110 @@ def cosine_similarity(a, b) -> float:
     return min(1.0, similarity)
 
 
-def sort(array: List[ScoredDocument]):
-    def sort_by_score(document: ScoredDocument):
-        return document.score
+def cosine_similarities(a, b) -> np.ndarray:
+    """
+    Returns the cosine similarity between the vector a and every row of the matrix b in one matrix multiplication.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, a.shape[-1])
+    norms = np.maximum(norm(b, ord=2, axis=1) * norm(a, ord=2), 1e-12)
+
+    return np.clip(matmul(b, a) / norms, -1.0, 1.0)
+
+
+def distances(a, b, metric: str) -> np.ndarray:
+    """
+    Returns the distances between the vector a and every row of the matrix b as reported by annoy for the given metric.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, a.shape[-1])
+
+    if metric == "angular":
+        return np.sqrt(np.maximum(0.0, 2 - 2 * cosine_similarities(a, b)))
+    if metric == "euclidean":
+        return norm(b - a, ord=2, axis=1)
+    if metric == "manhattan":
+        return np.abs(b - a).sum(axis=1)
+    if metric == "dot":
+        return matmul(b, a)
+    if metric == "hamming":
+        return (b != a).sum(axis=1).astype(np.float64)
+    raise ValueError(f"unknown metric {metric}")
+
+
+def distance_to_score(distances, metric: str, dim: int | None = None) -> np.ndarray:
+    """
+    Converts annoy distances into scores where higher is better. Angular distances are converted into the exact
+    cosine similarity, dot products are returned as is and the remaining metrics are mapped into (0, 1].
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+
+    if metric == "angular":
+        return np.clip(1 - np.square(distances) / 2, -1.0, 1.0)
+    if metric == "dot":
+        return distances
+    if metric == "hamming" and dim:
+        return 1 - distances / dim
+    return 1 / (1 + distances)
+
 
-    return list(sorted(array, key=sort_by_score, reverse=True))
+def sort(array: List[ScoredDocument], get_score: Callable[[T], float] = None):
+    get_score = get_score or (lambda x: x.score)
+    return list(sorted(array, key=get_score, reverse=True))
 
 
-def unique(array: List[ScoredDocument], get_key):
-    documents: Dict[str, ScoredDocument] = {}
+def top_k(array: Iterable[T], k: int, get_score: Callable[[T], float] = None) -> List[T]:
+    """
+    Returns the k items with the highest score in descending order in O(n log k).
+    """
+    return heapq.nlargest(k, array, key=get_score or (lambda x: x.score))
+
+
+def unique(array: List[ScoredDocument], get_key, k: int | None = None, get_score: Callable[[T], float] = None):
+    """
+    Keeps the item with the highest score per key in a single pass and returns the items in descending order of
+    their score, limited to the best k items if k is given.
+    """
+    get_score = get_score or (lambda x: x.score)
+    documents: Dict[Hashable, ScoredDocument] = {}
 
     for item in array:
         key = get_key(item)
 
-        if key in documents:
-            document = documents[key]
-            if item.score > document.score:
-                documents[key] = item
-        else:
+        document = documents.get(key)
+        if document is None or get_score(item) > get_score(document):
             documents[key] = item
 
-    return sort(list(documents.values()))
+    if k is not None:
+        return top_k(documents.values(), k, get_score)
+    return sort(list(documents.values()), get_score)
+
+
+def take_unique(array: Iterable[T], get_key, k: int | None = None) -> List[T]:
+    """
+    Returns the first k items with distinct keys of an iterable which is already ordered by relevance. The iterable
+    is consumed lazily, so no key is computed once k items are found.
+    """
+    seen = set()
+    items = []
+    for item in array:
+        if k is not None and len(items) >= k:
+            break
+        key = get_key(item)
+        if key not in seen:
+            seen.add(key)
+            items.append(item)
+    return items
 
 
 def flatten(array: list):
     return [item for sublist in array for item in sublist]
+
+
+def chunk(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Lazily splits the iterable into lists of the given size, the last list may be shorter.
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
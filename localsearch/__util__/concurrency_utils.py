@@ -0,0 +1,102 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Executor, TimeoutError
+from typing import Callable, Iterable, List, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+Timeouts = Union[None, float, List[Optional[float]]]
+
+
+def to_timeouts(timeouts: Timeouts, n: int) -> List[Optional[float]]:
+    if isinstance(timeouts, list):
+        if len(timeouts) != n:
+            raise ValueError(f"expected {n} timeouts but got {len(timeouts)}")
+        return timeouts
+    return [timeouts] * n
+
+
+def fan_out(
+        calls: List[Callable[[], T]],
+        executor: Optional[Executor] = None,
+        timeouts: Timeouts = None
+) -> List[Optional[T]]:
+    """
+    Runs the calls concurrently on the given executor and returns their results in order. Calls which do not finish
+    within their timeout (in seconds, measured from the start of the fan-out) are given up and yield None.
+    Without an executor the calls are run one after the other.
+    """
+    if executor is None:
+        return [call() for call in calls]
+
+    start = time.monotonic()
+    futures = [executor.submit(call) for call in calls]
+
+    results = []
+    for future, timeout in zip(futures, to_timeouts(timeouts, len(calls))):
+        remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+        try:
+            results.append(future.result(remaining))
+        except TimeoutError:
+            future.cancel()
+            results.append(None)
+    return results
+
+
+async def afan_out(
+        calls: List[Callable[[], T]],
+        executor: Optional[Executor] = None,
+        timeouts: Timeouts = None
+) -> List[Optional[T]]:
+    """
+    Asyncio variant of fan_out. The blocking calls are run on the executor (the default executor of the event loop
+    if none is given), calls exceeding their timeout yield None.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def run(call: Callable[[], T], timeout: Optional[float]) -> Optional[T]:
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(executor, call), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    return list(await asyncio.gather(*[run(c, t) for c, t in zip(calls, to_timeouts(timeouts, len(calls)))]))
+
+
+_DONE = object()
+
+
+def run_pipeline(items: Iterable[T], consumers: List[Callable[[T], None]], queue_size: int = 2) -> None:
+    """
+    Passes every item of the iterable to every consumer. Each consumer runs on its own thread and receives the
+    items in order through a bounded queue, so the items are produced lazily and at most `queue_size` items per
+    consumer are held in memory. The first error raised by a consumer stops the pipeline and is re-raised.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in consumers]
+    errors: List[BaseException] = []
+
+    def consume(items_: queue.Queue, consumer: Callable[[T], None]):
+        while (item := items_.get()) is not _DONE:
+            if len(errors) > 0:
+                continue
+            try:
+                consumer(item)
+            except BaseException as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=consume, args=e, daemon=True) for e in zip(queues, consumers)]
+    [thread.start() for thread in threads]
+
+    try:
+        for item in items:
+            if len(errors) > 0:
+                break
+            [e.put(item) for e in queues]
+    finally:
+        [e.put(_DONE) for e in queues]
+        [thread.join() for thread in threads]
+
+    if len(errors) > 0:
+        raise errors[0]
@@ -0,0 +1,17 @@
+import sqlite3
+from typing import Any, List, Sequence
+
+# stay below the sqlite limit of host parameters per statement
+MAX_PARAMETERS = 900
+
+
+def select_in(connection: sqlite3.Connection, sql: str, values: Sequence[Any]) -> List[tuple]:
+    """
+    Runs the query once per chunk of at most MAX_PARAMETERS values and returns the rows of all chunks. The `{}` in
+    the sql is replaced by the placeholders of a chunk, e.g. "SELECT data FROM documents WHERE idx IN ({})".
+    """
+    rows = []
+    for i in range(0, len(values), MAX_PARAMETERS):
+        chunk = list(values[i:i + MAX_PARAMETERS])
+        rows.extend(connection.execute(sql.format(",".join("?" * len(chunk))), chunk).fetchall())
+    return rows
@@ -1,3 +1,8 @@
+import threading
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable, List
+
 from localsearch.__spi__ import Lang
 
 
@@ -26,11 +31,69 @@ def lemmatize(text: str, lang: Lang):
     return " ".join([simplemma.lemmatize(token, lang=lang) for token in tokens])
 
 
+class Canonicalizer:
+    """
+    Reusable text canonicalizer which removes punctuation and stop words, lemmatizes the remaining tokens and
+    replaces the characters reserved by the tantivy query parser. The output is identical to applying
+    remove_punctuation, remove_stopwords and lemmatize one after the other, but every lookup table is built once.
+    """
+
+    _punctuation = str.maketrans("", "", "?!.,")
+    _reserved = str.maketrans({e: " " for e in "+-^`:{}\"[]()~!*\\"})
+
+    def __init__(self, lang: Lang, lemma_cache_size: int = 100_000):
+        import simplemma
+        from stop_words import get_stop_words
+
+        self.lang = lang
+        self._stop_words = frozenset(get_stop_words(lang))
+        self._lemmatize = lru_cache(maxsize=lemma_cache_size)(lambda e: simplemma.lemmatize(e, lang=lang))
+
+    def __call__(self, text: str) -> str:
+        tokens = text.translate(self._punctuation).split(" ")
+        tokens = [self._lemmatize(e) for e in tokens if len(e) > 0 and e.lower() not in self._stop_words]
+        return " ".join(tokens).translate(self._reserved)
+
+    def canonicalize_many(self, texts: Iterable[str]) -> List[str]:
+        return [self(text) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def get_canonicalizer(lang: Lang) -> Canonicalizer:
+    return Canonicalizer(lang)
+
+
 def md5(text: str):
     from hashlib import md5
     return str(md5(text.encode("utf-8")).hexdigest())
 
 
+@lru_cache(maxsize=65536)
+def fingerprint(text: str) -> bytes:
+    """
+    Cheap 8 byte content hash used to detect duplicate texts, cached as the same texts are hashed repeatedly.
+    """
+    return blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+_segmenters = threading.local()
+
+
+def get_segmenter(lang: Lang):
+    """
+    Returns the pysbd segmenter of the language, which is created once per thread as pysbd keeps the text of the
+    running call in the segmenter. The segmenter returns text spans, i.e. the sentences with their character
+    offsets in the text.
+    """
+    segmenters = getattr(_segmenters, "by_lang", None)
+    if segmenters is None:
+        segmenters = _segmenters.by_lang = {}
+    if lang not in segmenters:
+        import pysbd
+        segmenters[lang] = pysbd.Segmenter(language=lang, clean=False, char_span=True)
+    return segmenters[lang]
+
+
 # TODO: rename chunk_size, window_size to window_size, overlap
 def split_sentences(
         text: str,
@@ -38,9 +101,7 @@ def split_sentences(
         chunk_size: int = 3,
         window_size: int = 1
 ) -> list[str]:
-    import pysbd
-    seg = pysbd.Segmenter(language=language, clean=False)
-    sentences = seg.segment(text)
+    sentences = [e.sent for e in get_segmenter(language).segment(text)]
 
     return [" ".join(sentences[i:i + chunk_size]) for i in range(0, len(sentences), chunk_size-window_size)]
 
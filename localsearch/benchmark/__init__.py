@@ -0,0 +1 @@
+from .quantization_benchmark import QuantizationResult, run_quantization_benchmark
@@ -0,0 +1,18 @@
+import argparse
+
+from localsearch.benchmark.quantization_benchmark import run_quantization_benchmark
+
+parser = argparse.ArgumentParser(description="reports recall@k versus memory of the quantized vector storage")
+parser.add_argument("--n", type=int, default=20_000)
+parser.add_argument("--dim", type=int, default=384)
+parser.add_argument("--queries", type=int, default=100)
+parser.add_argument("--k", type=int, default=10)
+parser.add_argument("--rescore", type=int, default=4)
+parser.add_argument("--pq-subvectors", type=int, nargs="*", default=[16, 48])
+args = parser.parse_args()
+
+results = run_quantization_benchmark(args.n, args.dim, args.queries, args.k, args.rescore, args.pq_subvectors)
+print(f"{'method':<10}{'bytes/vec':>10}{'memory MB':>12}{'recall':>10}{'rescored':>10}{'ms/query':>10}")
+for e in results:
+    print(f"{e.method:<10}{e.bytes_per_vector:>10}{e.memory / 1e6:>12.2f}{e.recall:>10.3f}"
+          f"{e.rescored_recall:>10.3f}{e.query_ms:>10.2f}")
@@ -0,0 +1,78 @@
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from localsearch.searcher.quantization import ProductQuantizer, Quantizer, ScalarQuantizer, search
+
+
+@dataclass
+class QuantizationResult:
+    method: str
+    bytes_per_vector: int  # size of the scanned codes
+    memory: int  # bytes of the scanned codes of all vectors
+    recall: float  # recall@k of the code scan alone
+    rescored_recall: float  # recall@k after the exact rescoring of the shortlist
+    query_ms: float  # milliseconds per query including the rescoring
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _embeddings(n: int, dim: int, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Clustered unit vectors, which resemble sentence embeddings better than uniformly distributed ones.
+    """
+    centers = rng.standard_normal((n_clusters, dim))
+    vectors = centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.standard_normal((n, dim))
+    return _normalize(vectors).astype(np.float32)
+
+
+def _recall(expected: List[np.ndarray], actual: List[np.ndarray], k: int) -> float:
+    return float(np.mean([len(set(e[:k]) & set(a[:k])) / k for e, a in zip(expected, actual)]))
+
+
+def run_quantization_benchmark(
+        n: int = 20_000,
+        dim: int = 384,
+        n_queries: int = 100,
+        k: int = 10,
+        rescore: int = 4,
+        pq_subvectors: Optional[List[int]] = None,
+        seed: int = 42
+) -> List[QuantizationResult]:
+    """
+    Compares the recall@k and the memory of the float32, int8 and product quantized embeddings on synthetic data.
+    The exact float32 search is the ground truth.
+    """
+    rng = np.random.default_rng(seed)
+    data = _embeddings(n + n_queries, dim, 100, rng)
+    vectors, queries = data[:n], data[n:]
+
+    start = time.time()
+    expected = [e for e, _ in search(queries, vectors, k)]
+    results = [QuantizationResult("float32", 4 * dim, 4 * dim * n, 1.0, 1.0, (time.time() - start) * 1000 / n_queries)]
+
+    quantizers: List[Quantizer] = [ScalarQuantizer()]
+    quantizers += [ProductQuantizer(e) for e in pq_subvectors or [16, 48]]
+    for quantizer in quantizers:
+        quantizer.fit(vectors)
+        codes = quantizer.encode(vectors)
+        scanned = [e for e, _ in search(queries, vectors, k, quantizer, codes, rescore=1)]
+
+        start = time.time()
+        rescored = [e for e, _ in search(queries, vectors, k, quantizer, codes, rescore)]
+        seconds = time.time() - start
+
+        name = "int8" if isinstance(quantizer, ScalarQuantizer) else f"pq{quantizer.n_subvectors}"
+        results.append(QuantizationResult(
+            name,
+            codes.itemsize * codes.shape[1],
+            codes.nbytes,
+            _recall(expected, scanned, k),
+            _recall(expected, rescored, k),
+            seconds * 1000 / n_queries
+        ))
+    return results
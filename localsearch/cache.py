@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, List, Optional, Union
+
+import numpy as np
+
+from localsearch.__spi__ import Cache, Document, Encoder, ScoredDocument
+from localsearch.__spi__.types import CrossEncoder, Searcher, TextPair, Vector
+from localsearch.__util__.string_utils import fingerprint
+
+
+@dataclass
+class CacheStats:
+    hits: int
+    misses: int
+    size: int
+
+
+class LRUCache(Cache):
+    """
+    Thread-safe least recently used cache. Entries are evicted once more than `max_size` entries (or, if a
+    `sizeof` function is given, more than `max_bytes` bytes) are stored and expire `ttl` seconds after insertion.
+    """
+
+    def __init__(
+            self,
+            max_size: Optional[int] = 1024,
+            ttl: Optional[float] = None,
+            max_bytes: Optional[int] = None,
+            sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: OrderedDict[Hashable, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[1] < time.monotonic():
+                self._pop(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        size = self.sizeof(value) if self.sizeof is not None else 0
+
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (value, expires, size)
+            self._bytes += size
+
+            while len(self._entries) > 0 and self._is_full():
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]):
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if predicate(k, v[0])]:
+                self._pop(key)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self.hits, misses=self.misses, size=len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _is_full(self) -> bool:
+        if self.max_size is not None and len(self._entries) > self.max_size:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _pop(self, key: Hashable):
+        self._bytes -= self._entries.pop(key)[2]
+
+
+class CachedEncoder(Encoder):
+    """
+    Encoder wrapper which caches the embedding of every text. Only the texts missing in the cache are encoded,
+    all of them with a single call of the wrapped encoder. Searchers encode their documents with the wrapped
+    encoder (see `EncodingStage`), so only queries are cached.
+    """
+
+    def __init__(self, encoder: Encoder, cache: Optional[Cache] = None):
+        self.encoder = encoder
+        self.cache = cache if cache is not None else LRUCache()
+
+    def get_output_dim(self) -> int:
+        return self.encoder.get_output_dim()
+
+    def __call__(self, texts: Union[str, List[str]]) -> Vector:
+        if not isinstance(texts, list):
+            return self([texts])[0]
+
+        vectors = [self.cache.get(text) for text in texts]
+        missing = [i for i, e in enumerate(vectors) if e is None]
+        if len(missing) > 0:
+            encoded = self.encoder([texts[i] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = np.asarray(vector)
+                self.cache.put(texts[i], vectors[i])
+
+        return np.stack(vectors) if len(vectors) > 0 else np.empty((0, self.get_output_dim()))
+
+
+class CachedSearcher(Searcher):
+    """
+    Searcher wrapper which caches the results of every (text, n) query. Writes must go through the wrapper: an
+    append invalidates all cached results, a removal only the results which contain the removed documents.
+    """
+
+    def __init__(self, searcher: Searcher, cache: Optional[Cache] = None):
+        self.searcher = searcher
+        self.cache = cache if cache is not None else LRUCache()
+
+    def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
+        return self.read_batch([text], n)[0]
+
+    def read_batch(self, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+        results = [self.cache.get((text, n)) for text in texts]
+        missing = [i for i, e in enumerate(results) if e is None]
+        if len(missing) > 0:
+            for i, result in zip(missing, self.searcher.read_batch([texts[i] for i in missing], n)):
+                results[i] = result
+                self.cache.put((texts[i], n), result)
+
+        return [list(e) for e in results]
+
+    def append(self, documents: Union[Document, List[Document]]):
+        self.searcher.append(documents)
+        self.cache.invalidate(lambda k, v: True)
+
+    def remove(self, idx: str):
+        self.searcher.remove(idx)
+        self.cache.invalidate(lambda k, v: any(e.document.id == idx for e in v))
+
+    def search_by_source(self, source: str, n: Optional[int] = None) -> List[Document]:
+        return self.searcher.search_by_source(source, n)
+
+    def remove_by_source(self, source: str):
+        self.searcher.remove_by_source(source)
+        self.cache.invalidate(lambda k, v: any(e.document.source == source for e in v))
+
+
+class CachedCrossEncoder(CrossEncoder):
+    """
+    Cross encoder wrapper which caches the score of every (query, document hash) pair. Only the pairs missing in
+    the cache are scored, all of them with a single call of the wrapped cross encoder.
+    """
+
+    def __init__(self, cross_encoder: CrossEncoder, cache: Optional[Cache] = None):
+        self.cross_encoder = cross_encoder
+        self.cache = cache if cache is not None else LRUCache()
+
+    def __call__(self, texts: Union[TextPair, List[TextPair]]) -> Vector:
+        if not isinstance(texts, list):
+            return self([texts])
+
+        keys = [(query, fingerprint(text)) for query, text in texts]
+        scores = [self.cache.get(key) for key in keys]
+        missing = [i for i, e in enumerate(scores) if e is None]
+        if len(missing) > 0:
+            for i, score in zip(missing, np.asarray(self.cross_encoder([texts[i] for i in missing])).tolist()):
+                scores[i] = score
+                self.cache.put(keys[i], score)
+
+        return np.array(scores, dtype=np.float64)
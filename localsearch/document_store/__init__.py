@@ -0,0 +1,15 @@
+from .document_store import DocumentStore
+from .file_system_document_store import FileSystemDocumentStore
+from .migrate import DocumentFormat, migrate, open_document_store
+from .record_log_document_store import RecordLogDocumentStore
+from .sqlite_document_store import SqliteDocumentStore
+
+__all__ = [
+    DocumentStore,
+    DocumentFormat,
+    FileSystemDocumentStore,
+    RecordLogDocumentStore,
+    SqliteDocumentStore,
+    migrate,
+    open_document_store
+]
@@ -0,0 +1,20 @@
+import argparse
+
+from localsearch.document_store.migrate import migrate, open_document_store
+
+formats = ["json", "jsonl", "msgpack", "sqlite"]
+
+parser = argparse.ArgumentParser(description="converts a raw data folder into another document format")
+parser.add_argument("source")
+parser.add_argument("target")
+parser.add_argument("--source-format", choices=formats, default="json")
+parser.add_argument("--target-format", choices=formats, default="jsonl")
+parser.add_argument("--batch-size", type=int, default=10_000)
+args = parser.parse_args()
+
+count = migrate(
+    open_document_store(args.source, args.source_format),
+    open_document_store(args.target, args.target_format),
+    args.batch_size
+)
+print(f"migrated {count} documents from {args.source} to {args.target}")
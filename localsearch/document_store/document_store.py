@@ -0,0 +1,52 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from localsearch.__spi__.model import Document
+
+
+class DocumentStore(ABC):
+    """
+    Stores the raw documents of an index keyed by the integer index id and the document id.
+    """
+
+    @abstractmethod
+    def put_many(self, documents: List[Tuple[int, Document]]) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, idx: int) -> Optional[Document]:
+        pass
+
+    def get_many(self, idxs: List[int]) -> List[Optional[Document]]:
+        return [self.get(idx) for idx in idxs]
+
+    @abstractmethod
+    def ids(self) -> List[int]:
+        pass
+
+    @abstractmethod
+    def ids_by_document(self, document_id: str) -> List[int]:
+        pass
+
+    @abstractmethod
+    def ids_by_source(self, source: str) -> List[int]:
+        pass
+
+    def get_by_source(self, source: str, n: Optional[int] = None) -> List[Document]:
+        idxs = self.ids_by_source(source)
+        return [e for e in self.get_many(idxs[:n] if n else idxs) if e is not None]
+
+    @abstractmethod
+    def delete_many(self, idxs: List[int]) -> None:
+        pass
+
+    def next_idx(self) -> int:
+        """
+        Returns the index of the next document. Implementations do not hand out the indices of deleted documents
+        again, so searchers which keep their own id space (e.g. annoy) stay in step with the store.
+        """
+        ids = self.ids()
+        return max(ids) + 1 if ids else 0
+
+    def close(self) -> None:
+        pass
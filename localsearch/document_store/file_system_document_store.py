@@ -0,0 +1,63 @@
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from localsearch.__spi__.model import Document
+from localsearch.__util__.io_utils import delete_file, read_json, write_json
+from localsearch.document_store.document_store import DocumentStore
+
+
+class FileSystemDocumentStore(DocumentStore):
+    """
+    Document store which writes one json file per document named by its index. Lookups by document id or source
+    read every file, use RecordLogDocumentStore or SqliteDocumentStore for large collections.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._next_idx: Optional[int] = None  # scanned on first use, then kept in memory
+        if not os.path.exists(path):
+            os.makedirs(path)
+
+    def put_many(self, documents: List[Tuple[int, Document]]) -> None:
+        for idx, document in documents:
+            write_json(Path(self._path) / f"{idx}.json", asdict(document))
+        if self._next_idx is not None and len(documents) > 0:
+            self._next_idx = max(self._next_idx, max(idx for idx, _ in documents) + 1)
+
+    def get(self, idx: int) -> Optional[Document]:
+        path = Path(self._path) / f"{idx}.json"
+        return Document(**read_json(path)) if os.path.exists(path) else None
+
+    def ids(self) -> List[int]:
+        return sorted(int(e.removesuffix(".json")) for e in os.listdir(self._path) if e.endswith(".json"))
+
+    def ids_by_document(self, document_id: str) -> List[int]:
+        return [idx for idx in self.ids() if self.get(idx).id == document_id]
+
+    def ids_by_source(self, source: str) -> List[int]:
+        return [idx for idx in self.ids() if self.get(idx).source == source]
+
+    def delete_many(self, idxs: List[int]) -> None:
+        if len(idxs) == 0:
+            return
+        # remember the next index, otherwise deleting the last documents would hand out their indices again. The
+        # folder is scanned again as other instances might have written to it
+        self._next_idx = max(self._scan_next_idx(), self._next_idx or 0)
+        write_json(self._next_idx_path(), self._next_idx)
+        for idx in idxs:
+            delete_file(Path(self._path) / f"{idx}.json")
+
+    def next_idx(self) -> int:
+        if self._next_idx is None:
+            self._next_idx = self._scan_next_idx()
+        return self._next_idx
+
+    def _scan_next_idx(self) -> int:
+        path = self._next_idx_path()
+        return max(super().next_idx(), read_json(path) if os.path.exists(path) else 0)
+
+    def _next_idx_path(self) -> Path:
+        return Path(self._path) / "next_idx"
+
@@ -0,0 +1,36 @@
+from typing import Literal
+
+from localsearch.__util__.array_utils import chunk
+from localsearch.document_store.document_store import DocumentStore
+from localsearch.document_store.file_system_document_store import FileSystemDocumentStore
+from localsearch.document_store.record_log_document_store import RecordLogDocumentStore
+from localsearch.document_store.sqlite_document_store import SqliteDocumentStore
+
+DocumentFormat = Literal["json", "jsonl", "msgpack", "sqlite"]
+
+
+def open_document_store(path: str, format: DocumentFormat = "json", readonly: bool = False) -> DocumentStore:
+    """
+    Opens the document store of the given format in the folder `path`.
+    """
+    if format == "json":
+        return FileSystemDocumentStore(path)
+    if format in ["jsonl", "msgpack"]:
+        return RecordLogDocumentStore(path, format, readonly=readonly)
+    if format == "sqlite":
+        return SqliteDocumentStore(f"{path}/documents.db", readonly)
+    raise ValueError(f"unknown document format {format}")
+
+
+def migrate(source: DocumentStore, target: DocumentStore, batch_size: int = 10_000) -> int:
+    """
+    Copies all documents of the source store into the target store keeping their index.
+    :return: number of copied documents
+    """
+    n = 0
+    for idxs in chunk(source.ids(), batch_size):
+        documents = source.get_many(idxs)
+        target.put_many([(idx, e) for idx, e in zip(idxs, documents) if e is not None])
+        n += len(idxs)
+    return n
+
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Literal, Optional, Set, Tuple
+
+import numpy as np
+
+from localsearch.__spi__.model import Document
+from localsearch.document_store.document_store import DocumentStore
+
+# one fixed size slot per index, a length of 0 marks a missing or deleted document
+OFFSET_DTYPE = np.dtype([("shard", "<i4"), ("length", "<i4"), ("offset", "<i8")])
+
+
+class RecordLogDocumentStore(DocumentStore):
+    """
+    Document store which appends the encoded documents (jsonl or msgpack) to sharded record files. The position of
+    every record is kept in a dense offset index with one fixed size slot per index. The offset index is memory
+    mapped, so a random read by index costs one slot lookup and one positioned read.
+
+    Lookups by document id or source use a key log which is loaded on first use. Deleted records stay in the
+    shards until the store is rewritten with `migrate`. Only a single writing instance is supported.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            format: Literal["jsonl", "msgpack"] = "jsonl",
+            shard_size: int = 1 << 30,
+            readonly: bool = False
+    ) -> None:
+        if format == "msgpack":
+            try:
+                import msgpack
+                self._msgpack = msgpack
+            except ImportError:
+                raise ValueError("no msgpack library found, please install localsearch[msgpack]")
+
+        if not os.path.exists(path):
+            if readonly:
+                raise ValueError(f"no document store found at {path}")
+            os.makedirs(path)
+
+        self._path = path
+        self._format = format
+        self._shard_size = shard_size
+        self._readonly = readonly
+        self._lock = threading.Lock()
+        self._offsets: Optional[np.ndarray] = None
+        self._files: Dict[int, int] = {}
+
+        self._keys_position = 0
+        self._by_document: Optional[Dict[str, Set[int]]] = None
+        self._by_source: Dict[str, Set[int]] = {}
+        self._keys: Dict[int, Tuple[str, str]] = {}
+
+        shards = sorted(int(e.split("-")[1].split(".")[0]) for e in os.listdir(path) if e.startswith("shard-"))
+        self._shard = shards[-1] if shards else 0
+
+    def put_many(self, documents: List[Tuple[int, Document]]) -> None:
+        if self._readonly:
+            raise ValueError("document store is opened readonly")
+        if len(documents) == 0:
+            return
+
+        with self._lock:
+            slots = []
+            shard_path = self._shard_path(self._shard)
+            offset = os.path.getsize(shard_path) if os.path.exists(shard_path) else 0
+            records = []
+            for idx, document in documents:
+                record = self._encode(document)
+                if offset > 0 and offset + len(record) > self._shard_size:
+                    self._append(shard_path, records)
+                    self._shard, offset, records = self._shard + 1, 0, []
+                    shard_path = self._shard_path(self._shard)
+                slots.append((idx, self._shard, len(record), offset))
+                records.append(record)
+                offset += len(record)
+            self._append(shard_path, records)
+
+            keys = "".join(json.dumps([idx, d.id, d.source]) + "\n" for idx, d in documents)
+            with open(self._keys_path(), "a") as f:
+                f.write(keys)
+
+            self._write_slots(slots)
+
+    def get(self, idx: int) -> Optional[Document]:
+        return self.get_many([idx])[0]
+
+    def get_many(self, idxs: List[int]) -> List[Optional[Document]]:
+        offsets = self._get_offsets()
+        if any(idx >= len(offsets) or offsets[idx]["length"] == 0 for idx in idxs):
+            # the index might have been extended by another instance
+            offsets = self._get_offsets(refresh=True)
+
+        documents = []
+        for idx in idxs:
+            if idx >= len(offsets) or offsets[idx]["length"] == 0:
+                documents.append(None)
+                continue
+            shard, length, offset = offsets[idx]
+            documents.append(self._decode(os.pread(self._file(int(shard)), int(length), int(offset))))
+        return documents
+
+    def ids(self) -> List[int]:
+        return np.nonzero(self._get_offsets(refresh=True)["length"])[0].tolist()
+
+    def ids_by_document(self, document_id: str) -> List[int]:
+        self._load_keys()
+        return self._alive(self._by_document.get(document_id, set()))
+
+    def ids_by_source(self, source: str) -> List[int]:
+        self._load_keys()
+        return self._alive(self._by_source.get(source, set()))
+
+    def delete_many(self, idxs: List[int]) -> None:
+        if self._readonly:
+            raise ValueError("document store is opened readonly")
+
+        with self._lock:
+            size = os.path.getsize(self._offsets_path()) // OFFSET_DTYPE.itemsize
+            self._write_slots([(idx, 0, 0, 0) for idx in idxs if idx < size])
+
+    def next_idx(self) -> int:
+        # deleted slots are zeroed but kept, so the offset index covers every index handed out so far
+        return len(self._get_offsets(refresh=True))
+
+    def close(self) -> None:
+        with self._lock:
+            [os.close(e) for e in self._files.values()]
+            self._files = {}
+            self._offsets = None
+
+    def __len__(self):
+        return int(np.count_nonzero(self._get_offsets(refresh=True)["length"]))
+
+    def _encode(self, document: Document) -> bytes:
+        if self._format == "msgpack":
+            return self._msgpack.packb(asdict(document))
+        return (json.dumps(asdict(document)) + "\n").encode("utf-8")
+
+    def _decode(self, record: bytes) -> Document:
+        if self._format == "msgpack":
+            return Document(**self._msgpack.unpackb(record))
+        return Document(**json.loads(record))
+
+    def _append(self, path: str, records: List[bytes]):
+        with open(path, "ab") as f:
+            f.write(b"".join(records))
+
+    def _write_slots(self, slots: List[Tuple[int, int, int, int]]):
+        if len(slots) == 0:
+            return
+
+        slots = sorted(slots)
+        values = np.array([e[1:] for e in slots], dtype=OFFSET_DTYPE)
+        idxs = np.array([e[0] for e in slots])
+
+        # write consecutive slots with a single call
+        runs = np.split(np.arange(len(slots)), np.nonzero(np.diff(idxs) != 1)[0] + 1)
+        with open(self._offsets_path(), "r+b" if os.path.exists(self._offsets_path()) else "w+b") as f:
+            for run in runs:
+                f.seek(int(idxs[run[0]]) * OFFSET_DTYPE.itemsize)
+                f.write(values[run].tobytes())
+        self._offsets = None
+
+    def _get_offsets(self, refresh: bool = False) -> np.ndarray:
+        offsets = self._offsets
+        if offsets is None or refresh:
+            path = self._offsets_path()
+            size = os.path.getsize(path) // OFFSET_DTYPE.itemsize if os.path.exists(path) else 0
+            if offsets is None or len(offsets) != size:
+                offsets = np.memmap(path, OFFSET_DTYPE, "r", shape=(size,)) if size else np.empty(0, OFFSET_DTYPE)
+                self._offsets = offsets
+        return offsets
+
+    def _file(self, shard: int) -> int:
+        if shard not in self._files:
+            with self._lock:
+                if shard not in self._files:
+                    self._files[shard] = os.open(self._shard_path(shard), os.O_RDONLY)
+        return self._files[shard]
+
+    def _load_keys(self):
+        """
+        Reads the key log from the last read position on, so that keys appended in the meantime are included.
+        """
+        with self._lock:
+            if self._by_document is None:
+                self._by_document = {}
+            if not os.path.exists(self._keys_path()):
+                return
+
+            with open(self._keys_path(), "rb") as f:
+                f.seek(self._keys_position)
+                while (line := f.readline()).endswith(b"\n"):
+                    self._keys_position += len(line)
+                    idx, document_id, source = json.loads(line)
+                    if idx in self._keys:
+                        old_id, old_source = self._keys[idx]
+                        self._by_document[old_id].discard(idx)
+                        self._by_source[old_source].discard(idx)
+                    self._keys[idx] = (document_id, source)
+                    self._by_document.setdefault(document_id, set()).add(idx)
+                    self._by_source.setdefault(source, set()).add(idx)
+
+    def _alive(self, idxs: Set[int]) -> List[int]:
+        offsets = self._get_offsets(refresh=True)
+        return sorted(idx for idx in idxs if idx < len(offsets) and offsets[idx]["length"] > 0)
+
+    def _shard_path(self, shard: int) -> str:
+        return str(Path(self._path) / f"shard-{shard:05d}.{self._format}")
+
+    def _offsets_path(self) -> str:
+        return str(Path(self._path) / "offsets.idx")
+
+    def _keys_path(self) -> str:
+        return str(Path(self._path) / "keys.jsonl")
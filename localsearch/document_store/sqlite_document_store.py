@@ -0,0 +1,91 @@
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from localsearch.__spi__.model import Document
+from localsearch.__util__.sqlite_utils import select_in
+from localsearch.document_store.document_store import DocumentStore
+
+
+class SqliteDocumentStore(DocumentStore):
+    """
+    Document store which is backed by a single sqlite file. The connection is opened once and shared between
+    threads.
+    """
+
+    def __init__(self, path: str, readonly: bool = False) -> None:
+        self._lock = threading.Lock()
+        if readonly:
+            self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            return
+
+        if not os.path.exists(Path(path).parent):
+            os.makedirs(Path(path).parent)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents (idx INTEGER PRIMARY KEY, id TEXT, source TEXT, data TEXT)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS documents_id ON documents (id)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS documents_source ON documents (source)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._connection.commit()
+
+    def put_many(self, documents: List[Tuple[int, Document]]) -> None:
+        rows = [(idx, e.id, e.source, json.dumps(asdict(e))) for idx, e in documents]
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)", rows)
+            self._connection.commit()
+
+    def get(self, idx: int) -> Optional[Document]:
+        return self.get_many([idx])[0]
+
+    def get_many(self, idxs: List[int]) -> List[Optional[Document]]:
+        if len(idxs) == 0:
+            return []
+
+        with self._lock:
+            rows = select_in(self._connection, "SELECT idx, data FROM documents WHERE idx IN ({})", idxs)
+
+        documents = {idx: Document(**json.loads(data)) for idx, data in rows}
+        return [documents.get(idx) for idx in idxs]
+
+    def ids(self) -> List[int]:
+        return self._select_ids("SELECT idx FROM documents ORDER BY idx")
+
+    def ids_by_document(self, document_id: str) -> List[int]:
+        return self._select_ids("SELECT idx FROM documents WHERE id = ? ORDER BY idx", document_id)
+
+    def ids_by_source(self, source: str) -> List[int]:
+        return self._select_ids("SELECT idx FROM documents WHERE source = ? ORDER BY idx", source)
+
+    def delete_many(self, idxs: List[int]) -> None:
+        next_idx = self.next_idx()
+        with self._lock:
+            # remember the next index, otherwise deleting the last documents would hand out their indices again
+            self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('next_idx', ?)", (next_idx,))
+            self._connection.executemany("DELETE FROM documents WHERE idx = ?", [(idx,) for idx in idxs])
+            self._connection.commit()
+
+    def next_idx(self) -> int:
+        with self._lock:
+            max_idx = self._connection.execute("SELECT MAX(idx) FROM documents").fetchone()[0]
+            row = self._connection.execute("SELECT value FROM meta WHERE key = 'next_idx'").fetchone()
+        return max(max_idx + 1 if max_idx is not None else 0, row[0] if row else 0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _select_ids(self, sql: str, *params) -> List[int]:
+        with self._lock:
+            return [e[0] for e in self._connection.execute(sql, params).fetchall()]
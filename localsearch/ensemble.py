@@ -1,17 +1,52 @@
+from concurrent.futures import Executor
+from functools import partial
 from typing import Union, List, Optional
 
 from localsearch import Document, ScoredDocument
-from localsearch.__spi__.types import Searcher
+from localsearch.__spi__.types import Fusion, Searcher, read_batch
 from localsearch.__util__ import flatten
+from localsearch.__util__.concurrency_utils import Timeouts, afan_out, fan_out
 
 
 class SearchEnsemble(Searcher):
-
-    def __init__(self, searchers: List[Searcher]):
+    """
+    Combines the results of multiple searchers. If an executor is given, the searchers are queried concurrently
+    and searchers exceeding their timeout (a single value or one per searcher) are left out of the result.
+
+    Without a fusion the results of all searchers are concatenated. With a fusion the results are merged into a
+    single ranking of the n best unique documents, scored by the fused score.
+    """
+
+    def __init__(
+            self,
+            searchers: List[Searcher],
+            executor: Optional[Executor] = None,
+            timeouts: Timeouts = None,
+            fusion: Optional[Fusion] = None
+    ):
         self.searchers = searchers
+        self.executor = executor
+        self.timeouts = timeouts
+        self.fusion = fusion
 
     def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
-        return flatten([e.read(text, n) for e in self.searchers])
+        results = fan_out([partial(e.read, text, n) for e in self.searchers], self.executor, self.timeouts)
+        return self._combine(results, n)
+
+    async def aread(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
+        results = await afan_out([partial(e.read, text, n) for e in self.searchers], self.executor, self.timeouts)
+        return self._combine(results, n)
+
+    def read_batch(self, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+        results = fan_out([partial(read_batch, e, texts, n) for e in self.searchers], self.executor, self.timeouts)
+        results = [e if e is not None else [[] for _ in texts] for e in results]
+        return [self._combine(list(e), n) for e in zip(*results)] if results else [[] for _ in texts]
+
+    def _combine(self, results: List[Optional[List[ScoredDocument]]], n: Optional[int]) -> List[ScoredDocument]:
+        if self.fusion is None:
+            return flatten([e for e in results if e is not None])
+        # timed out searchers are kept as empty results so that the results match the fusion weights
+        return self.fusion([e if e is not None else [] for e in results], n)
 
     def append(self, documents: Union[Document, List[Document]]):
         [e.append(documents) for e in self.searchers]
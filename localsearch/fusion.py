@@ -0,0 +1,96 @@
+import heapq
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+
+from localsearch.__spi__ import Fusion, ScoredDocument
+
+Normalization = Literal["minmax", "zscore"]
+
+
+def _top_k(documents: Dict[str, ScoredDocument], scores: Dict[str, float], n: Optional[int]) -> List[ScoredDocument]:
+    items = scores.items()
+    top = heapq.nlargest(n, items, key=lambda x: x[1]) if n else sorted(items, key=lambda x: x[1], reverse=True)
+    return [ScoredDocument(score, documents[key].document) for key, score in top]
+
+
+def _weights(weights: Optional[List[float]], n_results: int) -> List[float]:
+    if weights is None:
+        return [1.0] * n_results
+    if len(weights) != n_results:
+        raise ValueError(f"expected {n_results} weights but got {len(weights)}")
+    return weights
+
+
+def normalize(scores: np.ndarray, normalization: Normalization) -> np.ndarray:
+    if len(scores) == 0:
+        return scores
+    if normalization == "minmax":
+        spread = scores.max() - scores.min()
+        return (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    if normalization == "zscore":
+        std = scores.std()
+        return (scores - scores.mean()) / std if std > 0 else np.zeros_like(scores)
+    raise ValueError(f"unknown normalization {normalization}")
+
+
+class ReciprocalRankFusion(Fusion):
+    """
+    Scores every document by the weighted sum of 1 / (k + rank) over all results. Only the ranks are used, so the
+    scores of the readers do not need to be comparable.
+    """
+
+    def __init__(self, k: int = 60, weights: Optional[List[float]] = None):
+        self.k = k
+        self.weights = weights
+
+    def __call__(self, results: List[List[ScoredDocument]], n: Optional[int] = None) -> List[ScoredDocument]:
+        documents: Dict[str, ScoredDocument] = {}
+        scores: Dict[str, float] = {}
+        for weight, result in zip(_weights(self.weights, len(results)), results):
+            for rank, e in enumerate(result):
+                documents.setdefault(e.document.id, e)
+                scores[e.document.id] = scores.get(e.document.id, 0.0) + weight / (self.k + rank + 1)
+
+        return _top_k(documents, scores, n)
+
+
+class LinearFusion(Fusion):
+    """
+    Scores every document by the weighted sum of its min-max or z-score normalised scores over all results.
+    """
+
+    def __init__(self, normalization: Normalization = "minmax", weights: Optional[List[float]] = None):
+        self.normalization = normalization
+        self.weights = weights
+
+    def __call__(self, results: List[List[ScoredDocument]], n: Optional[int] = None) -> List[ScoredDocument]:
+        documents: Dict[str, ScoredDocument] = {}
+        scores: Dict[str, float] = {}
+        hits: Dict[str, int] = {}
+        for weight, result in zip(_weights(self.weights, len(results)), results):
+            normalized = normalize(np.asarray([e.score for e in result], dtype=float), self.normalization)
+            for e, score in zip(result, normalized.tolist()):
+                documents.setdefault(e.document.id, e)
+                scores[e.document.id] = scores.get(e.document.id, 0.0) + weight * score
+                hits[e.document.id] = hits.get(e.document.id, 0) + 1
+
+        return _top_k(documents, self._combine(scores, hits), n)
+
+    def _combine(self, scores: Dict[str, float], hits: Dict[str, int]) -> Dict[str, float]:
+        return scores
+
+
+class CombSUM(LinearFusion):
+    """
+    Sum of the normalised scores of a document (Fox and Shaw), the unweighted linear fusion.
+    """
+
+
+class CombMNZ(LinearFusion):
+    """
+    Sum of the normalised scores of a document multiplied by the number of results which contain the document.
+    """
+
+    def _combine(self, scores: Dict[str, float], hits: Dict[str, int]) -> Dict[str, float]:
+        return {key: score * hits[key] for key, score in scores.items()}
@@ -1,17 +1,21 @@
-from dataclasses import dataclass, asdict
-from typing import List, Optional
-import os
-from pathlib import Path
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from itertools import islice
+from typing import Callable, Iterable, List, Optional, Sequence, Sized, Union
 
 import numpy as np
 from tqdm import tqdm
 
 from localsearch.__spi__ import Reader, Writer
-from localsearch.__spi__.model import RankedDocument, ScoredDocument, Documents
-from localsearch.__spi__.types import CrossEncoder
-from localsearch.__util__.array_utils import unique, flatten
-from localsearch.__util__.string_utils import md5
-from localsearch.__util__.io_utils import write_json
+from localsearch.__spi__.model import Document, RankedDocument, ScoredDocument
+from localsearch.__spi__.types import CrossEncoder, Fusion, TextPair, read_batch
+from localsearch.__util__.array_utils import chunk, flatten, take_unique, unique
+from localsearch.__util__.concurrency_utils import Timeouts, afan_out, fan_out, run_pipeline
+from localsearch.__util__.string_utils import fingerprint
+from localsearch.document_store import DocumentFormat, open_document_store
+from localsearch.fusion import ReciprocalRankFusion
 
 
 @dataclass
@@ -19,13 +23,37 @@ class SearchConfig:
     n: int = 5
     min_rank_score: float = 0.001
     unique_hash: bool = True
+    fusion: Optional[Fusion] = None  # merges the reader results, the weights refer to the order of the readers
+    rerank_top_k: Optional[int] = None  # number of candidates per query passed to the reranker
+    rerank_batch_size: Optional[int] = None  # number of pairs per reranker call, None scores all pairs at once
+    # score the candidates in batches of rerank_batch_size (default n) in first stage order and stop once
+    # n candidates reached min_rank_score
+    rerank_cascade: bool = False
 
 
 class SearchPipeline:
+    """
+    Queries all readers and reranks the combined results with the optional cross encoder. If an executor is given,
+    the readers are queried concurrently and readers exceeding their timeout (a single value or one per reader)
+    are left out of the result.
 
-    def __init__(self, readers: List[Reader], reranker: Optional[CrossEncoder] = None):
+    With `config.fusion` the reader results are merged into a single ranking, which is the final order if no
+    reranker is given. With `config.rerank_top_k` only the best candidates of the fused ranking (reciprocal rank
+    fusion by default) are reranked, which bounds the cost of the cross encoder independent of the number of
+    readers.
+    """
+
+    def __init__(
+            self,
+            readers: List[Reader],
+            reranker: Optional[CrossEncoder] = None,
+            executor: Optional[Executor] = None,
+            timeouts: Timeouts = None
+    ):
         self.readers = readers
         self.reranker = reranker
+        self.executor = executor
+        self.timeouts = timeouts
 
     def search(
             self,
@@ -34,64 +62,229 @@ class SearchPipeline:
             config: SearchConfig = SearchConfig()
     ) -> List[RankedDocument]:
 
-        results = flatten([reader.read(query) for reader in self.readers])
-        results = unique(results, lambda x: x.document.id)
-        queries = list(map(lambda x: (query, x.document.fields[index_field]), results))
+        return self.search_batch([query], index_field, config)[0]
+
+    async def asearch(
+            self,
+            query: str,
+            index_field: str = "text",
+            config: SearchConfig = SearchConfig()
+    ) -> List[RankedDocument]:
+
+        return (await self.asearch_batch([query], index_field, config))[0]
+
+    def search_batch(
+            self,
+            queries: List[str],
+            index_field: str = "text",
+            config: SearchConfig = SearchConfig()
+    ) -> List[List[RankedDocument]]:
+        """
+        Searches all queries at once. Every reader is called once for the whole batch and all query/document pairs
+        are reranked with a single cross encoder call.
+        """
+        if len(queries) == 0:
+            return []
+
+        results = fan_out([partial(read_batch, e, queries) for e in self.readers], self.executor, self.timeouts)
+        return self._rerank(queries, results, index_field, config)
+
+    async def asearch_batch(
+            self,
+            queries: List[str],
+            index_field: str = "text",
+            config: SearchConfig = SearchConfig()
+    ) -> List[List[RankedDocument]]:
 
         if len(queries) == 0:
             return []
 
+        calls = [partial(read_batch, e, queries) for e in self.readers]
+        results = await afan_out(calls, self.executor, self.timeouts)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(self._rerank, queries, results, index_field, config)
+        )
+
+    def _rerank(
+            self,
+            queries: List[str],
+            results: List[Optional[List[List[ScoredDocument]]]],
+            index_field: str,
+            config: SearchConfig
+    ) -> List[List[RankedDocument]]:
+
+        # timed out readers are kept as empty results so that the results match the fusion weights
+        results = [e if e is not None else [[] for _ in queries] for e in results]
+        results = [self._preselect(list(e), config) for e in zip(*results)] if results else [[] for _ in queries]
+
+        if self.reranker is None:
+            scores = [np.full(len(e), config.min_rank_score) for e in results]
+        elif config.rerank_cascade:
+            scores = self._score_cascade(queries, results, index_field, config)
+        else:
+            pairs = [(query, x.document.fields[index_field]) for query, e in zip(queries, results) for x in e]
+            values = self._call_reranker(pairs, config.rerank_batch_size)
+            offsets = np.cumsum([0] + [len(e) for e in results])
+            scores = [values[offsets[i]:offsets[i + 1]] for i in range(len(results))]
+
+        # candidates left out by the cascade are not part of the result
+        return [self._rank(e[:len(s)], s, index_field, config) for e, s in zip(results, scores)]
+
+    @staticmethod
+    def _preselect(results: Sequence[List[ScoredDocument]], config: SearchConfig) -> List[ScoredDocument]:
+        """
+        Combines the results of the readers for a single query. Without fusion and rerank budget all unique
+        documents are kept, otherwise the rerank_top_k documents with the highest fused score in descending order.
+        """
+        if config.fusion is None and config.rerank_top_k is None:
+            return unique(flatten(list(results)), lambda x: x.document.id)
+
+        fusion = config.fusion or ReciprocalRankFusion()
+        return fusion(list(results), config.rerank_top_k)
+
+    def _score_cascade(
+            self,
+            queries: List[str],
+            results: List[List[ScoredDocument]],
+            index_field: str,
+            config: SearchConfig
+    ) -> List[np.ndarray]:
+        """
+        Reranks the candidates of all queries in rounds of one batch per query and stops scoring the candidates of
+        a query as soon as n of them reached min_rank_score.
+        """
+        batch_size = config.rerank_batch_size or config.n
+        scores: List[List[float]] = [[] for _ in queries]
+        passed = [set() for _ in queries]
+
+        def done(i: int) -> bool:
+            return len(scores[i]) == len(results[i]) or len(passed[i]) >= config.n
+
+        while True:
+            batch = [
+                (i, j) for i in range(len(queries)) if not done(i)
+                for j in range(len(scores[i]), min(len(scores[i]) + batch_size, len(results[i])))
+            ]
+            if len(batch) == 0:
+                break
+
+            pairs = [(queries[i], results[i][j].document.fields[index_field]) for i, j in batch]
+            for (i, j), score in zip(batch, self._call_reranker(pairs).tolist()):
+                scores[i].append(score)
+                if score >= config.min_rank_score:
+                    document = results[i][j].document
+                    passed[i].add(fingerprint(document.fields[index_field]) if config.unique_hash else document.id)
+
+        return [np.asarray(e) for e in scores]
+
+    def _call_reranker(self, pairs: List[TextPair], batch_size: Optional[int] = None) -> np.ndarray:
+        if len(pairs) == 0:
+            return np.empty(0)
+        batches = chunk(pairs, batch_size) if batch_size else [pairs]
+        return np.concatenate([np.asarray(self.reranker(e), dtype=float).reshape(-1) for e in batches])
+
+    def _rank(
+            self,
+            results: List[ScoredDocument],
+            scores: np.ndarray,
+            index_field: str,
+            config: SearchConfig
+    ) -> List[RankedDocument]:
+
+        if len(results) == 0:
+            return []
+
         if self.reranker is not None:
-            scores = self.reranker(queries)
-            # noinspection PyTypeChecker
-            indices = list(reversed(np.argsort(scores).tolist()))
+            indices = np.argsort(-scores, kind="stable").tolist()
         else:
-            scores = np.full(len(queries), config.min_rank_score)
-            indices = [i for i in range(len(queries))]
+            indices = range(len(results))
 
         def to_ranked_document(document: ScoredDocument, rank_score: float):
             return RankedDocument(score=document.score, document=document.document, rank_score=rank_score)
 
-        results = [to_ranked_document(result, score.item()) for result, score in zip(results, scores)]
-        results = [results[i] for i in indices]
-        if config.unique_hash:
-            results = unique(results, lambda x: md5(x.document.fields[index_field]))
+        # the documents are ordered by rank score, so the filter and the deduplication stop after n documents
+        ranked = (to_ranked_document(results[i], scores[i].item()) for i in indices)
         if config.min_rank_score > 0:
-            results = list(filter(lambda x: x.rank_score >= config.min_rank_score, results))
-        return results[:config.n]
+            ranked = (e for e in ranked if e.rank_score >= config.min_rank_score)
+        if config.unique_hash:
+            return take_unique(ranked, lambda x: fingerprint(x.document.fields[index_field]), config.n)
+        return list(islice(ranked, config.n))
 
 
 class IndexPipeline:
+    """
+    Writes documents in batches to all writers and stores the raw documents in `raw_data_dir` using the document
+    store of the given `raw_data_format`. The documents are
+    consumed lazily by a writer thread behind a bounded queue of `queue_size` batches, so the memory usage does not
+    depend on the number of documents. The writers append each batch concurrently, the raw documents of a batch
+    are stored once all writers appended it.
+    """
+
+    default_batch_size = 1000
 
     def __init__(
             self,
             raw_data_dir: str,
             writers: List[Writer],
+            queue_size: int = 2,
+            raw_data_format: DocumentFormat = "json"
     ) -> None:
 
         self._raw_data_dir = raw_data_dir
-        if not os.path.exists(raw_data_dir):
-            os.makedirs(raw_data_dir)
+        self._store = open_document_store(raw_data_dir, raw_data_format)
         self._writers = writers
+        self._queue_size = queue_size
+        # the store does not reuse the indices of deleted documents, so the index is only read once
+        self._next_idx = self._store.next_idx()
+
+    def add(
+            self,
+            docs: Union[Document, Iterable[Document]],
+            batch_size: int | None = None,
+            verbose: bool = False
+    ) -> None:
+
+        docs = [docs] if isinstance(docs, Document) else docs
+        if not batch_size:
+            batch_size = len(docs) if isinstance(docs, Sized) and len(docs) > 0 else self.default_batch_size
+
+        batches = chunk(docs, batch_size)
+        if verbose:
+            total = -(-len(docs) // batch_size) if isinstance(docs, Sized) else None
+            batches = tqdm(batches, total=total)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self._writers))) as executor:
+            run_pipeline(batches, [partial(self._write, executor)], self._queue_size)
 
-    def add(self, docs: Documents, batch_size: int | None = None, verbose: bool = False) -> None:
-        docs = docs if isinstance(docs, list) else [docs]
-        batch_size = batch_size if batch_size else len(docs)
+    def close(self) -> None:
+        """
+        Closes the writers which hold resources (e.g. the encoding pools of the semantic searchers) and the store.
+        """
+        for writer in self._writers:
+            close = getattr(writer, "close", None)
+            if close is not None:
+                close()
+        self._store.close()
 
-        idxs = range(0, len(docs), batch_size)
-        for idx in tqdm(idxs, total=len(idxs)) if verbose else idxs:
-            docs_batch = docs[idx: idx+batch_size]
+    def __enter__(self) -> "IndexPipeline":
+        return self
 
-            for writer in self._writers:
-                writer.append(docs_batch)
+    def __exit__(self, *args):
+        self.close()
 
-            for idx, doc in enumerate(docs_batch, self._get_start_idx()):
-                write_json(Path(self._raw_data_dir) / f"{idx}.json", asdict(doc))
+    def _write(self, executor: Executor, docs: List[Document]) -> None:
+        idx = self._next_idx
+        fan_out([self._append(writer, docs, idx) for writer in self._writers], executor)
 
-    def _get_start_idx(self) -> int:
-        idxs = [
-            int(fn.removesuffix(".json")) for fn in os.listdir(self._raw_data_dir)
-            if fn.endswith(".json")
-        ]
+        self._store.put_many(list(enumerate(docs, idx)))
+        self._next_idx += len(docs)
 
-        return max(idxs) + 1 if idxs else 0
+    @staticmethod
+    def _append(writer: Writer, docs: List[Document], idx: int) -> Callable[[], None]:
+        # writers which index the raw documents by their store index (e.g. annoy) get the index of the batch
+        append_at = getattr(writer, "append_at", None)
+        if append_at is not None:
+            return partial(append_at, docs, idx)
+        return partial(writer.append, docs)
@@ -1,3 +1,4 @@
 from .annoy_search import AnnoySearch, AnnoyConfig
-from .networkx_search import NetworkxSearch
+from .networkx_search import NetworkxSearch, NetworkxConfig
+from .numpy_search import NumpySearch, NumpyConfig
 from .tantivy_search import TantivySearch, TantivyConfig
@@ -1,95 +1,210 @@
 import os
-from dataclasses import asdict, dataclass, field
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Literal, Optional, Union
+from typing import Callable, List, Literal, Optional, Set, Tuple, Union
 
 import numpy as np
 
-from localsearch.__spi__ import Document, Encoder, IndexedDocument, ScoredDocument
-from localsearch.__spi__.types import Searcher
-from localsearch.__util__.array_utils import cosine_similarity
-from localsearch.__util__.io_utils import delete_file, delete_folder, grep, list_files, read_json, write_json
+from localsearch.__spi__ import Document, Encoder, ScoredDocument
+from localsearch.__util__.array_utils import cosine_similarities, distance_to_score, distances
+from localsearch.__util__.io_utils import read_json
+from localsearch.document_store import DocumentFormat, DocumentStore, open_document_store
+from localsearch.searcher.encoding import EncodingStage
+from localsearch.searcher.vector_search import VectorSearch
 
 
 @dataclass
 class AnnoyConfig:
     path: str
-    raw_data_dir: Optional[str] = None  # TODO: better handling in AnnoySearch methods
+    raw_data_dir: Optional[str] = None  # documents written by the IndexPipeline
+    raw_data_format: DocumentFormat = "json"
+    store_format: Literal["sqlite", "jsonl", "msgpack"] = "sqlite"  # used if no raw_data_dir is given
     n: int = 5
     n_trees: int = 10
     search_k: int = -1  # defaults to n_trees * n
     index_name: Optional[str] = "annoy"
     index_fields: Optional[List[str]] = field(default_factory=lambda: ["text"])
     metric: Literal["angular", "euclidean", "manhattan", "hamming", "dot"] = "euclidean"
+    # "cosine" returns the cosine similarity (derived from the annoy distances for the angular metric),
+    # "metric" converts the annoy distances via distance_to_score, a callable maps distances to scores
+    scoring: Union[Literal["cosine", "metric"], Callable[[np.ndarray], np.ndarray]] = "cosine"
+    segmented: bool = False  # sealed annoy index + in-memory delta segment instead of rebuild on write
+    max_delta_size: int = 1000  # number of pending appends/removes which triggers a compaction
+    background_compaction: bool = True
+    encode_batch_size: Optional[int] = None  # micro-batch size of the encoder calls, None encodes all at once
+    encode_workers: int = 1
+    encode_executor: Literal["thread", "process"] = "thread"
+    sort_by_length: bool = True
+    encode_progress: bool = False
+    n_jobs: int = -1  # number of threads used to build the trees, -1 uses all cores
+    on_disk_build: bool = False  # build the index in a file next to the index instead of in RAM
+    prefault: bool = False  # read the whole index into the page cache when it is loaded
 
 
-class AnnoySearch(Searcher):
+@dataclass
+class BuildStats:
+    n_items: int
+    n_trees: int
+    seconds: float
+    peak_memory: Optional[int]  # peak resident set size of the process in bytes
+
+
+def _peak_memory() -> Optional[int]:
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+class _DeltaSegment:
+    """
+    Small in-memory segment which holds the vectors not yet part of the sealed annoy index.
+    Queries are answered by brute force.
+    """
+
+    def __init__(self, dim: int):
+        self.ids: List[int] = []
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids: List[int], vectors):
+        self.ids.extend(ids)
+        self.vectors = np.vstack([self.vectors, np.asarray(vectors, dtype=np.float32)])
+
+    def remove(self, ids: Set[int]) -> Set[int]:
+        keep = [i for i, e in enumerate(self.ids) if e not in ids]
+        removed = set(self.ids) & ids
+        self.ids = [self.ids[i] for i in keep]
+        self.vectors = self.vectors[keep]
+        return removed
+
+    def search(self, vector, n: int, tombstones: Set[int], metric: str) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        """
+        Returns the ids, annoy distances and vectors of the n nearest items.
+        """
+        mask = np.array([e not in tombstones for e in self.ids], dtype=bool)
+        ids = np.array(self.ids, dtype=np.int64)[mask]
+        vectors = self.vectors[mask]
+        if len(ids) == 0:
+            return [], np.empty(0), vectors
+
+        values = distances(vector, vectors, metric)
+        order = np.argsort(-values if metric == "dot" else values, kind="stable")[:n]
+        return ids[order].tolist(), values[order], vectors[order]
+
+
+class AnnoySearch(VectorSearch):
     """
     Semantic search implementation which is based on the annoy library (https://github.com/spotify/annoy)
 
     This search implementation supports read as well as write functionality.
+
+    If `config.segmented` is set, writes do not rebuild the annoy index. Appended vectors are kept in an in-memory
+    delta segment and removed items in a tombstone set. Both are merged with the sealed annoy index at query time
+    and compacted into a new sealed index once `config.max_delta_size` pending changes are reached.
+
+    A readonly searcher attaches to an already built index for serving, e.g. from many worker processes. The index
+    file is memory mapped and shared through the page cache, the document store is opened readonly and no
+    directory is scanned on startup.
     """
 
-    def __init__(self, config: AnnoyConfig, encoder: Encoder):
+    kind = "annoy"
+
+    def __init__(self, config: AnnoyConfig, encoder: Encoder, readonly: bool = False):
         try:
             from annoy import AnnoyIndex
 
             self.path = config.path + f"/{config.index_name}.ann"
             self.encoder = encoder
-            self.index = AnnoyIndex(encoder.get_output_dim(), config.metric)
             self.AnnoyIndex = AnnoyIndex
-            self.id_map: Dict[int, str] = {}
-            if os.path.exists(self.path):
-                self.index.load(self.path)
-                folder = self.path.replace(".ann", "")
-                files = [e.replace(".json", "") for e in list_files(folder, recursive=True)]
-                self.id_map = {int(e.split("_")[1]): e.split("_")[0] for e in files}
             self.config = config
+            self.readonly = readonly
+            self.build_stats: Optional[BuildStats] = None
+            if os.path.exists(self.path):
+                self.index = AnnoyIndex(encoder.get_output_dim(), config.metric)
+                self.index.load(self.path, config.prefault)
+            elif readonly:
+                raise ValueError(f"no annoy index found at {self.path}")
+            else:
+                self.index = self._new_index()
+            self.store = self._open_store()
+            self._encoding = EncodingStage(
+                encoder,
+                config.encode_batch_size,
+                config.encode_workers,
+                config.encode_executor,
+                config.sort_by_length,
+                config.encode_progress
+            )
+
+            if config.segmented and not readonly:
+                self._init_segments()
         except ImportError:
             raise ValueError("no annoy library found, please install localsearch[annoy]")
 
     def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
-        vector = self.encoder(text)
-        indices = self.index.get_nns_by_vector(vector, n or self.config.n, self.config.search_k)
-        vectors = [self.index.get_item_vector(i) for i in indices]
-        scores = [cosine_similarity(np.array(item), vector) for item in vectors]
-        if not self.config.raw_data_dir:
-            indices = [self.id_map[e] for e in indices]
+        return self._read_vectors([self.encoder(text)], n or self.config.n)[0]
+
+    def read_batch(self, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+        if len(texts) == 0:
+            return []
+        return self._read_vectors(self.encoder(texts), n or self.config.n)
+
+    def _read_vectors(self, vectors, n: int) -> List[List[ScoredDocument]]:
+        search = self._search_segmented if self.config.segmented and not self.readonly else self._search
+        return self._to_results([search(vector, n) for vector in vectors])
 
-        documents = [self._read_document(idx) for idx in indices]
-        return [ScoredDocument(s, d) for s, d in zip(scores, documents)]
+    def _search(self, vector, n: int) -> List[Tuple[int, float]]:
+        indices, values = self.index.get_nns_by_vector(vector, n, self.config.search_k, include_distances=True)
+        scores = self._score(vector, values, lambda: [self.index.get_item_vector(i) for i in indices])
+        return list(zip(indices, scores.tolist()))
 
     def append(self, documents: Union[Document, List[Document]]):
+        return self.append_at(documents, None)
+
+    def append_at(self, documents: Union[Document, List[Document]], idx: Optional[int]):
+        """
+        Appends the documents under the indices idx, idx + 1, ... which the IndexPipeline assigned to them in the
+        raw data store. Without an index the next index of the store is used.
+        """
         documents = documents if isinstance(documents, list) else [documents]
 
         if len(documents) == 0:
             return []
 
+        self._check_writable()
+        if self.config.segmented:
+            return self._append_segmented(documents, idx)
+
         if os.path.exists(self.path):
             self._rebuild()
 
-        folder = self.path.replace(".ann", "")
-        idx = self.index.get_n_items()
-
-        def to_text(document: Document):
-            return " ".join([document.fields[e] for e in self.config.index_fields])
+        # the indices of the store are not reused after a remove, the annoy index skips the gaps
+        idx = self.store.next_idx() if idx is None else idx
 
-        batch = [to_text(d) for d in documents]
-        vectors = self.encoder(batch)
-
-        for i, vector in enumerate(vectors):
-            self.id_map[idx + i] = documents[i].id
-            self.index.add_item(idx + i, vector)
-            if not self.config.raw_data_dir:
-                document = documents[i]
-                write_json(f"{folder}/{document.source}/{document.id}_{idx + i}.json", asdict(documents[i]))
+        # items are added to the index while the following micro-batches are encoded
+        for positions, vectors in self._encoding([self._to_text(d) for d in documents]):
+            for i, vector in zip(positions, vectors):
+                self.index.add_item(idx + i, vector)
+        if not self.config.raw_data_dir:
+            self.store.put_many([(idx + i, document) for i, document in enumerate(documents)])
 
         self._save()
 
     def remove(self, idx: str):
-        if not self.config.raw_data_dir:
-            folder = self.path.replace(".ann", "")
-            delete_file(grep(folder, idx + "_"))
+        self._check_writable()
+        if self.config.segmented:
+            return self._remove_segmented(set(self.store.ids_by_document(idx)))
+
+        self.store.delete_many(self.store.ids_by_document(idx))
 
         self._rebuild()
         self._save()
@@ -101,37 +216,206 @@ class AnnoySearch(Searcher):
 
         For performance reasons it is recommended to append documents in batches.
         """
-        new_index = self.AnnoyIndex(self.encoder.get_output_dim(), self.config.metric)
-        folder = self.config.raw_data_dir if self.config.raw_data_dir else self.path.replace(".ann", "")
-        for path in list_files(folder, recursive=True):
-            path = Path(path)
-            if path.suffix == ".json":
-                idx = int(path.stem) if self.config.raw_data_dir else int(path.stem.split("_")[1])
-                vector = self.index.get_item_vector(idx)
-                new_index.add_item(idx, vector)
+        new_index = self._new_index()
+        for idx in self.store.ids():
+            vector = self.index.get_item_vector(idx)
+            new_index.add_item(idx, vector)
 
         os.remove(self.path)
         self.index = new_index
 
     def _save(self):
-        self.index.build(self.config.n_trees)
-        self.index.save(self.path)
+        self._build(self.index, self.path)
+
+    def _new_index(self):
+        index = self.AnnoyIndex(self.encoder.get_output_dim(), self.config.metric)
+        if self.config.on_disk_build:
+            os.makedirs(Path(self.path).parent, exist_ok=True)
+            index.on_disk_build(self.path + ".build")
+        return index
 
-    def _read_document(self, idx: str) -> IndexedDocument:
-        if folder := self.config.raw_data_dir:
-            return IndexedDocument(**read_json(Path(folder) / f"{idx}.json"), index=self.config.index_name)
+    def _build(self, index, path: str):
+        """
+        Builds the trees of the given index and stores it at the given path.
+        """
+        start = time.perf_counter()
+        index.build(self.config.n_trees, self.config.n_jobs)
+        if self.config.on_disk_build:
+            index.unload()
+            os.replace(self.path + ".build", path)
+            index.load(path)
         else:
-            folder = self.path.replace(".ann", "")
-            return IndexedDocument(**read_json(grep(folder, idx)), index=self.config.index_name)
+            index.save(path)
+
+        self.build_stats = BuildStats(
+            n_items=index.get_n_items(),
+            n_trees=self.config.n_trees,
+            seconds=time.perf_counter() - start,
+            peak_memory=_peak_memory()
+        )
 
-    def search_by_source(self, source: str, n: Optional[int] = None) -> List[Document]:
-        folder = self.config.raw_data_dir if self.config.raw_data_dir else self.path.replace(".ann", "")
-        files = list_files(f"{folder}/{source}")
-        return [Document(**read_json(f"{folder}/{source}/{e}")) for e in files]
+    def _open_store(self) -> DocumentStore:
+        if self.config.raw_data_dir:
+            return open_document_store(self.config.raw_data_dir, self.config.raw_data_format, self.readonly)
+        base = self.path.replace(".ann", "")
+        exists = os.path.exists(base + ".db")
+        store = self._open_index_store(base)
+        if self.readonly or self.config.store_format != "sqlite":
+            return store
+
+        # import documents of the legacy layout which stored one json file per document
+        legacy_folder = base
+        if not exists and os.path.exists(legacy_folder):
+            documents = []
+            for root, _, files in os.walk(legacy_folder):
+                for file in files:
+                    if file.endswith(".json"):
+                        idx = int(Path(file).stem.split("_")[-1])
+                        documents.append((idx, Document(**read_json(f"{root}/{file}"))))
+            store.put_many(documents)
+
+        return store
 
     def remove_by_source(self, source: str):
-        folder = self.config.raw_data_dir if self.config.raw_data_dir else self.path.replace(".ann", "")
-        delete_folder(f"{folder}/{source}")
+        self._check_writable()
+        idxs = self.store.ids_by_source(source)
+        if self.config.segmented:
+            return self._remove_segmented(set(idxs))
+        self.store.delete_many(idxs)
 
         self._rebuild()
         self._save()
+
+    def compact(self, wait: bool = True):
+        """
+        Merges the delta segment and the tombstones into a new sealed annoy index.
+        :param wait: block until the new index is built and swapped in
+        """
+        self._check_writable()
+        if not self.config.segmented:
+            raise ValueError("compaction requires segmented mode")
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                compaction = self._compaction
+            else:
+                frozen = self._delta
+                self._delta = _DeltaSegment(self.encoder.get_output_dim())
+                self._compacting = frozen
+                tombstones = set(self._tombstones)
+                index = self.index
+                n_sealed = index.get_n_items() if self._sealed else 0
+                sealed_ids = [i for i in self.store.ids() if i < n_sealed and i not in tombstones]
+
+                compaction = threading.Thread(
+                    target=self._compact, args=(index, sealed_ids, frozen, tombstones), daemon=True
+                )
+                self._compaction = compaction
+                compaction.start()
+
+        if wait:
+            compaction.join()
+
+    def _compact(self, index, sealed_ids: List[int], frozen: _DeltaSegment, tombstones: Set[int]):
+        new_index = self._new_index()
+        for idx in sealed_ids:
+            new_index.add_item(idx, index.get_item_vector(idx))
+        for idx, vector in zip(frozen.ids, frozen.vectors):
+            if idx not in tombstones:
+                new_index.add_item(idx, vector)
+
+        os.makedirs(Path(self.path).parent, exist_ok=True)
+        self._build(new_index, self.path + ".tmp")
+
+        with self._lock:
+            os.replace(self.path + ".tmp", self.path)
+            self.index = new_index
+            self._sealed = True
+            self._compacting = None
+            self._tombstones -= tombstones
+
+    def _init_segments(self):
+        self._lock = threading.RLock()
+        self._delta = _DeltaSegment(self.encoder.get_output_dim())
+        self._compacting: Optional[_DeltaSegment] = None
+        self._compaction: Optional[threading.Thread] = None
+        self._sealed = os.path.exists(self.path)
+
+        # items which are indexed but have no document anymore are tombstones, documents which are
+        # not part of the sealed index were pending in the delta segment and are re-encoded
+        n_items = self.index.get_n_items() if self._sealed else 0
+        ids = self.store.ids()
+        live = set(ids)
+        self._tombstones: Set[int] = {i for i in range(n_items) if i not in live}
+        self._next_idx = max(n_items, self.store.next_idx())
+
+        pending = [i for i in ids if i >= n_items]
+        if len(pending) > 0:
+            documents = self.store.get_many(pending)
+            self._delta.add(pending, self._encoding.encode([self._to_text(d) for d in documents]))
+
+    def _score(self, vector, values, get_vectors: Callable[[], list]) -> np.ndarray:
+        """
+        Converts the distances of the nearest neighbours into scores. Item vectors are only fetched if the cosine
+        similarity cannot be derived from the distances, all scores are computed at once.
+        """
+        if len(values) == 0:
+            return np.empty(0)
+
+        scoring = self.config.scoring
+        if callable(scoring):
+            return np.asarray(scoring(np.asarray(values)))
+        if scoring == "metric" or self.config.metric == "angular":
+            return distance_to_score(values, self.config.metric, self.encoder.get_output_dim())
+        return cosine_similarities(vector, get_vectors())
+
+    def _search_segmented(self, vector, n: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            index = self.index if self._sealed else None
+            segments = [e for e in [self._compacting, self._delta] if e is not None]
+            tombstones = set(self._tombstones)
+
+        hits: List[Tuple[int, float]] = []
+        if index is not None:
+            # over-fetch by the number of tombstones so that deleted items do not shrink the result
+            indices, values = index.get_nns_by_vector(
+                vector, n + len(tombstones), self.config.search_k, include_distances=True
+            )
+            candidates = [(i, v) for i, v in zip(indices, values) if i not in tombstones][:n]
+            indices, values = [e[0] for e in candidates], [e[1] for e in candidates]
+            scores = self._score(vector, values, lambda: [index.get_item_vector(i) for i in indices])
+            hits.extend(zip(indices, scores.tolist()))
+        for segment in segments:
+            indices, values, vectors = segment.search(vector, n, tombstones, self.config.metric)
+            hits.extend(zip(indices, self._score(vector, values, lambda: vectors).tolist()))
+
+        return sorted(hits, key=lambda x: x[1], reverse=True)[:n]
+
+    def _append_segmented(self, documents: List[Document], idx: Optional[int]):
+        vectors = self._encoding.encode([self._to_text(d) for d in documents])
+
+        with self._lock:
+            if idx is None:
+                idx = self.store.next_idx() if self.config.raw_data_dir else self._next_idx
+            ids = list(range(idx, idx + len(documents)))
+            self._next_idx = max(self._next_idx, idx + len(documents))
+
+        if not self.config.raw_data_dir:
+            self.store.put_many(list(zip(ids, documents)))
+
+        with self._lock:
+            self._delta.add(ids, vectors)
+
+        self._maybe_compact()
+
+    def _remove_segmented(self, ids: Set[int]):
+        self.store.delete_many(list(ids))
+
+        with self._lock:
+            removed = self._delta.remove(ids)
+            self._tombstones |= ids - removed
+
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self._delta) + len(self._tombstones) >= self.config.max_delta_size:
+            self.compact(wait=not self.config.background_compaction)
@@ -0,0 +1,147 @@
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Literal, Optional, Tuple
+
+import numpy as np
+
+from localsearch.__spi__ import Encoder
+from localsearch.cache import CachedEncoder
+
+_worker_encoder: Optional[Encoder] = None
+
+
+def _init_worker(encoder: Encoder):
+    global _worker_encoder
+    _worker_encoder = encoder
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return np.asarray(_worker_encoder(texts))
+
+
+@dataclass
+class EncodeStats:
+    documents: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds > 0 else 0.0
+
+
+class EncodingStage:
+    """
+    Encodes texts in micro-batches on a thread or process pool. The texts are sorted by length so that every
+    micro-batch contains texts of similar length, which reduces the padding of transformer based encoders.
+    Encoded batches are yielded as soon as they are available, so that the caller can index them while the
+    following batches are encoded.
+
+    If no batch size is given, all texts are encoded with a single call of the encoder. A CachedEncoder is
+    bypassed, its cache is meant for the queries and would be flushed by the documents.
+    """
+
+    def __init__(
+            self,
+            encoder: Encoder,
+            batch_size: Optional[int] = None,
+            workers: int = 1,
+            executor: Literal["thread", "process"] = "thread",
+            sort_by_length: bool = True,
+            verbose: bool = False
+    ):
+        self.encoder = encoder.encoder if isinstance(encoder, CachedEncoder) else encoder
+        self.batch_size = batch_size
+        self.workers = workers
+        self.executor = executor
+        self.sort_by_length = sort_by_length
+        self.verbose = verbose
+        self.stats = EncodeStats()
+        self._pool: Optional[Executor] = None
+
+    def __call__(self, texts: List[str]) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """
+        Yields the positions of the encoded texts together with their vectors.
+        """
+        start = time.perf_counter()
+        self.stats = EncodeStats()
+
+        positions = list(range(len(texts)))
+        if self.sort_by_length and self.batch_size:
+            positions = sorted(positions, key=lambda i: len(texts[i]), reverse=True)
+
+        batch_size = self.batch_size or max(1, len(texts))
+        batches = [positions[i:i + batch_size] for i in range(0, len(positions), batch_size)]
+
+        progress = None
+        if self.verbose:
+            from tqdm import tqdm
+            progress = tqdm(total=len(texts), unit="docs")
+
+        for batch, vectors in self._encode_batches(texts, batches):
+            self.stats.documents += len(batch)
+            self.stats.batches += 1
+            self.stats.seconds = time.perf_counter() - start
+            if progress is not None:
+                progress.update(len(batch))
+                progress.set_postfix(docs_per_second=f"{self.stats.documents_per_second:.1f}")
+            yield batch, vectors
+
+        if progress is not None:
+            progress.close()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns the vectors of all texts in the order of the texts.
+        """
+        vectors = np.empty((len(texts), self.encoder.get_output_dim()), dtype=np.float32)
+        for positions, batch in self(texts):
+            vectors[positions] = batch
+        return vectors
+
+    def close(self):
+        """
+        Shuts the worker pool down, it is started again by the next call.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "EncodingStage":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _encode_batches(self, texts: List[str], batches: List[List[int]]) -> Iterator[Tuple[List[int], np.ndarray]]:
+        if self.workers <= 1:
+            for batch in batches:
+                yield batch, np.asarray(self.encoder([texts[i] for i in batch]))
+            return
+
+        # keep a bounded number of batches in flight and yield them in submission order
+        pool = self._get_pool()
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, self._submit(pool, [texts[i] for i in batch])))
+            if len(pending) >= 2 * self.workers:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+    def _submit(self, pool: Executor, texts: List[str]):
+        if self.executor == "process":
+            return pool.submit(_encode_in_worker, texts)
+        return pool.submit(lambda: np.asarray(self.encoder(texts)))
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.executor == "process":
+                self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.encoder,))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers)
+        return self._pool
@@ -0,0 +1,152 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from localsearch.__util__.io_utils import read_json, write_json
+
+# the edge data written by NetworkxSearch.add_edge, the remaining edge attributes are stored as columns
+_edge_keys = {"source_id", "target_id", "type"}
+
+
+def _columns(rows: List[dict], exclude=frozenset()) -> Dict[str, List[Any]]:
+    keys = {key for row in rows for key in row if key not in exclude}
+    return {key: [row.get(key) for row in rows] for key in sorted(keys)}
+
+
+def _rows(columns: Dict[str, List[Any]], n: int) -> List[dict]:
+    rows = [{} for _ in range(n)]
+    for key, values in columns.items():
+        for row, value in zip(rows, values):
+            if value is not None:
+                row[key] = value
+    return rows
+
+
+def _save(path: str, array: np.ndarray):
+    np.save(path + ".tmp.npy", array)
+    os.replace(path + ".tmp.npy", path)
+
+
+def _write_json(path: str, document):
+    write_json(path + ".tmp", document)
+    os.replace(path + ".tmp", path)
+
+
+def write_snapshot(graph, path: str):
+    """
+    Writes the graph into the snapshot directory. The node table and the node and edge attributes are stored as
+    JSON columns, the edges as symmetric CSR arrays with one entry per direction and an edge type code per entry.
+    """
+    os.makedirs(path, exist_ok=True)
+    node_ids = list(graph.nodes)
+    positions = {e: i for i, e in enumerate(node_ids)}
+
+    edges = list(graph.edges(data=True))
+    edge_types = sorted({e[2].get("type") for e in edges if e[2].get("type") is not None})
+    type_codes = {e: i for i, e in enumerate(edge_types)}
+
+    rows, cols, codes, forward = [], [], [], []
+    for source_id, target_id, edge in edges:
+        if edge.get("source_id") == target_id and edge.get("target_id") == source_id:
+            source_id, target_id = target_id, source_id
+        code = type_codes.get(edge.get("type"), -1)
+        rows.append(positions[source_id])
+        cols.append(positions[target_id])
+        codes.append(code)
+        forward.append(True)
+        if source_id != target_id:
+            rows.append(positions[target_id])
+            cols.append(positions[source_id])
+            codes.append(code)
+            forward.append(False)
+
+    order = np.argsort(np.asarray(rows, dtype=np.int64), kind="stable")
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(np.asarray(rows, dtype=np.int64), minlength=len(node_ids)))
+
+    _save(f"{path}/indptr.npy", indptr)
+    _save(f"{path}/indices.npy", np.asarray(cols, dtype=np.int64)[order])
+    _save(f"{path}/edge_types.npy", np.asarray(codes, dtype=np.int32)[order])
+    _save(f"{path}/forward.npy", np.asarray(forward, dtype=bool)[order])
+
+    # the edge columns are ordered like the forward entries of the CSR arrays, there is one per edge
+    forward_rows = np.asarray(rows, dtype=np.int64)[np.asarray(forward, dtype=bool)]
+    forward_edges = [edges[i][2] for i in np.argsort(forward_rows, kind="stable")]
+
+    _write_json(f"{path}/edge_types.json", edge_types)
+    _write_json(f"{path}/edge_columns.json", _columns(forward_edges, _edge_keys))
+    _write_json(f"{path}/node_columns.json", _columns([graph.nodes[e] for e in node_ids]))
+    _write_json(f"{path}/nodes.json", node_ids)
+
+
+def read_snapshot(path: str, mmap: bool = True) -> Tuple[Any, Optional[tuple]]:
+    """
+    Reads the graph of the snapshot directory and returns it together with the CSR arrays (indptr, indices and
+    edge type codes) and the edge type names. With mmap the arrays are memory mapped instead of read.
+    """
+    import networkx as nx
+
+    graph = nx.Graph()
+    if not os.path.exists(f"{path}/nodes.json"):
+        return graph, None
+
+    node_ids = read_json(f"{path}/nodes.json")
+    graph.add_nodes_from(zip(node_ids, _rows(read_json(f"{path}/node_columns.json"), len(node_ids))))
+
+    mmap_mode = "r" if mmap else None
+    indptr = np.load(f"{path}/indptr.npy", mmap_mode=mmap_mode)
+    indices = np.load(f"{path}/indices.npy", mmap_mode=mmap_mode)
+    codes = np.load(f"{path}/edge_types.npy", mmap_mode=mmap_mode)
+    forward = np.load(f"{path}/forward.npy")
+    edge_types = read_json(f"{path}/edge_types.json")
+
+    rows = np.repeat(np.arange(len(node_ids)), np.diff(indptr))[forward]
+    cols = np.asarray(indices)[forward]
+    types = np.asarray(codes)[forward]
+    edge_columns = _rows(read_json(f"{path}/edge_columns.json"), len(rows))
+
+    edges = []
+    for row, col, code, edge in zip(rows.tolist(), cols.tolist(), types.tolist(), edge_columns):
+        source_id, target_id = node_ids[row], node_ids[col]
+        edge.update(source_id=source_id, target_id=target_id)
+        if code >= 0:
+            edge["type"] = edge_types[code]
+        edges.append((source_id, target_id, edge))
+    graph.add_edges_from(edges)
+
+    return graph, (indptr, indices, codes, edge_types)
+
+
+class GraphLog:
+    """
+    Append-only JSON lines log of the writes since the last snapshot.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def append(self, operation: str, **kwargs):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"op": operation, **kwargs}) + "\n")
+        self._file.flush()
+
+    def read(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            # a partially written last line is ignored
+            return [json.loads(line) for line in f if line.endswith("\n")]
+
+    def truncate(self):
+        self.close()
+        open(self.path, "w").close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
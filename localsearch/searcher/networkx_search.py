@@ -1,50 +1,281 @@
-from typing import List, Optional
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
 
 from localsearch import ScoredDocument
-from localsearch.__spi__ import Writer, Reader, Documents, Traverser
+from localsearch.__spi__ import Writer, Reader, Documents, IndexedDocument, Traverser
+from localsearch.searcher.graph_snapshot import GraphLog, read_snapshot, write_snapshot
+
+_token_pattern = re.compile(r"\w+")
+
+# node attribute holding the source of appended documents
+_source_key = "_source"
+
+
+@dataclass
+class NetworkxConfig:
+    n: int = 5
+    hops: int = 2
+    decay: float = 0.5  # factor applied to the scores per hop
+    edge_weights: Dict[str, float] = field(default_factory=dict)  # weight per edge type
+    default_edge_weight: float = 1.0  # weight of edge types missing in edge_weights
+    include_seeds: bool = False
+    text_field: str = "text"
+    index_name: str = "networkx"
+    mmap: bool = True  # memory map the edge arrays of a snapshot
 
 
 class NetworkxSearch(Traverser, Reader, Writer):
+    """
+    Knowledge graph based on networkx. Nodes are looked up by id directly in the graph, the ids of the nodes per
+    type and the neighbours per edge type are kept in secondary indexes which are maintained by every write.
 
-    def __init__(self, path: Optional[str] = None):
+    Reading expands a set of seed nodes by `config.hops` hops. The seeds are the documents found by the
+    `seed_readers` (matched by id) or, without seed readers, the nodes sharing tokens with the query. Every hop
+    propagates the scores over the edges weighted by edge type and multiplied by `config.decay`. The expansion
+    runs on a sparse adjacency matrix which is built on the first read after a write.
+
+    A file or a path ending with .graphml is imported from GraphML (if it exists) and only written by `save`, any
+    other path is a snapshot directory (see `graph_snapshot`). Writes to a snapshot directory are appended to a log
+    which is replayed on load, `save` writes a new snapshot and clears the log. The adjacency matrix of a snapshot
+    is built from its memory mapped CSR arrays.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            config: Optional[NetworkxConfig] = None,
+            seed_readers: Optional[List[Reader]] = None
+    ):
         import networkx as nx
-        if path is not None:
+        self.path = path
+        self.config = config or NetworkxConfig()
+        self.seed_readers = seed_readers or []
+        self._adjacency = None
+        self._snapshot = None
+        self._tokens: Optional[Dict[str, List[str]]] = None
+        self._log: Optional[GraphLog] = None
+
+        if path is None or (_is_graphml(path) and not os.path.exists(path)):
+            self.graph = nx.Graph()
+        elif _is_graphml(path):
             self.graph = nx.read_graphml(path)
         else:
-            self.graph = nx.Graph()
+            self.graph, self._snapshot = read_snapshot(path, self.config.mmap)
+
+        # dicts with None values are used as insertion ordered sets
+        self._types: Dict[str, Dict[str, None]] = {}
+        self._edges: Dict[str, Dict[str, Dict[str, None]]] = {}
+        for node_id, fields in self.graph.nodes(data=True):
+            self._index_node(node_id, fields)
+        for source_id, target_id, edge in self.graph.edges(data=True):
+            self._index_edge(source_id, target_id, edge.get("type"))
+
+        if path is not None and not _is_graphml(path):
+            log = GraphLog(f"{path}/log.jsonl")
+            self._replay(log.read())
+            self._log = log
+
+    def save(self, path: Optional[str] = None):
+        """
+        Writes the graph as snapshot or, if the path is a file or ends with .graphml, exports it to GraphML.
+        """
+        import networkx as nx
+
+        path = path or self.path
+        if _is_graphml(path):
+            nx.write_graphml(self.graph, path)
+            return
+
+        write_snapshot(self.graph, path)
+        if path == self.path and self._log is not None:
+            self._log.truncate()
+
+    def _replay(self, operations: List[dict]):
+        for e in operations:
+            if e["op"] == "add_node":
+                self.add_node(e["node_id"], e["fields"])
+            elif e["op"] == "add_edge":
+                self.add_edge(e["source_id"], e["target_id"], e["edge_type"])
+            elif e["op"] == "remove":
+                self.remove(e["node_id"])
 
     def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
-        # TODO: implement
-        pass
+        return self.expand(self._seeds(text), n)
+
+    def expand(self, seeds: Dict[str, float], n: Optional[int] = None) -> List[ScoredDocument]:
+        """
+        Returns the n best nodes reached from the seed nodes with the given scores.
+        """
+        node_ids, positions, adjacency = self._get_adjacency()
+        seeds = {positions[key]: score for key, score in seeds.items() if key in positions}
+        if len(seeds) == 0:
+            return []
+
+        frontier = np.zeros(len(node_ids))
+        frontier[list(seeds.keys())] = list(seeds.values())
+        scores = frontier.copy() if self.config.include_seeds else np.zeros(len(node_ids))
+        for _ in range(self.config.hops):
+            frontier = self.config.decay * (adjacency @ frontier)
+            scores += frontier
+        if not self.config.include_seeds:
+            scores[list(seeds.keys())] = 0
+
+        n = min(n or self.config.n, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [self._to_scored_document(node_ids[i], scores[i].item()) for i in top if scores[i] > 0]
+
+    def _seeds(self, text: str) -> Dict[str, float]:
+        seeds: Dict[str, float] = {}
+        if self.seed_readers:
+            for reader in self.seed_readers:
+                for e in reader.read(text):
+                    seeds[e.document.id] = max(seeds.get(e.document.id, 0.0), e.score)
+            return seeds
+
+        tokens = set(_token_pattern.findall(text.lower()))
+        for token in tokens:
+            for node_id in self._get_tokens().get(token, []):
+                seeds[node_id] = seeds.get(node_id, 0.0) + 1 / len(tokens)
+        return seeds
+
+    def _get_tokens(self) -> Dict[str, List[str]]:
+        """
+        Returns the lookup table of the lower cased tokens of the node texts, built on the first use after a write.
+        """
+        if self._tokens is None:
+            tokens: Dict[str, List[str]] = {}
+            for node_id, fields in self.graph.nodes(data=True):
+                for token in set(_token_pattern.findall(str(fields.get(self.config.text_field, "")).lower())):
+                    tokens.setdefault(token, []).append(node_id)
+            self._tokens = tokens
+        return self._tokens
+
+    def _get_adjacency(self):
+        """
+        Returns the node ids, the positions of the node ids and the CSR adjacency matrix holding the edge type
+        weights, built on the first use after a write.
+        """
+        if self._adjacency is None:
+            try:
+                from scipy.sparse import csr_matrix
+            except ImportError:
+                raise ValueError("no scipy library found, please install localsearch[networkx]")
+
+            node_ids = list(self.graph.nodes)
+            positions = {e: i for i, e in enumerate(node_ids)}
+            shape = (len(node_ids), len(node_ids))
+
+            if self._snapshot is not None:
+                indptr, indices, codes, edge_types = self._snapshot
+                # the default weight is appended so that edges without type (code -1) get it
+                weights = [self.config.edge_weights.get(e, self.config.default_edge_weight) for e in edge_types]
+                weights = np.asarray(weights + [self.config.default_edge_weight])[codes]
+                self._adjacency = node_ids, positions, csr_matrix((weights, indices, indptr), shape=shape)
+                return self._adjacency
+
+            rows, cols, weights = [], [], []
+            for source_id, target_id, edge in self.graph.edges(data=True):
+                weight = self.config.edge_weights.get(edge.get("type"), self.config.default_edge_weight)
+                rows += [positions[source_id], positions[target_id]]
+                cols += [positions[target_id], positions[source_id]]
+                weights += [weight, weight]
+
+            adjacency = csr_matrix((weights, (rows, cols)), shape=shape, dtype=np.float64)
+            self._adjacency = node_ids, positions, adjacency
+        return self._adjacency
+
+    def _to_scored_document(self, node_id: str, score: float) -> ScoredDocument:
+        source = self.graph.nodes[node_id].get(_source_key, "")
+        document = IndexedDocument(node_id, source, self._fields(node_id), self.config.index_name)
+        return ScoredDocument(score, document)
+
+    def _invalidate(self):
+        self._adjacency = None
+        self._snapshot = None
+        self._tokens = None
 
     def append(self, documents: Documents):
-        nodes = [(e.id, e.fields) for e in documents]
-        self.graph.add_nodes_from(nodes)
+        documents = documents if isinstance(documents, list) else [documents]
+        for e in documents:
+            # the source is kept as reserved node attribute, so that expanded neighbours resolve to their source
+            self.add_node(e.id, {**e.fields, _source_key: e.source})
 
     def remove(self, idx: str):
-        pass
+        if idx not in self.graph:
+            return
+        if self._log is not None:
+            self._log.append("remove", node_id=idx)
+
+        self._unindex_node(idx)
+        for neighbour in list(self.graph.neighbors(idx)):
+            self._unindex_edge(idx, neighbour)
+        self._edges.pop(idx, None)
+        self.graph.remove_node(idx)
+        self._invalidate()
 
     def add_node(self, node_id: str, fields: dict):
+        if self._log is not None:
+            self._log.append("add_node", node_id=node_id, fields=fields)
+        if node_id in self.graph:
+            self._unindex_node(node_id)
         self.graph.add_nodes_from([(node_id, fields)])
+        self._index_node(node_id, self.graph.nodes[node_id])
+        self._invalidate()
 
     def add_edge(self, source_id: str, target_id: str, edge_type: str):
+        if self._log is not None:
+            self._log.append("add_edge", source_id=source_id, target_id=target_id, edge_type=edge_type)
+        if self.graph.has_edge(source_id, target_id):
+            self._unindex_edge(source_id, target_id)
         edge = {"source_id": source_id, "target_id": target_id, "type": edge_type}
         self.graph.add_edges_from([(source_id, target_id, edge)])
+        self._index_edge(source_id, target_id, edge_type)
+        self._invalidate()
+
+    def get_edges(self, node_id: str, edge_type: Optional[str] = None):
+        if edge_type is None:
+            edges = self.graph.edges(node_id, data=True)
+            return [edge[2] for edge in edges]
 
-    def get_edges(self, node_id: str):
-        edges = self.graph.edges(node_id, data=True)
-        return [edge[2] for edge in edges]
+        neighbours = self._edges.get(node_id, {}).get(edge_type, {})
+        return [self.graph.edges[node_id, e] for e in neighbours]
 
     def search_by_type(self, node_type: str):
-        nodes = self.graph.nodes(data=True)
-        nodes = filter(lambda x: x[1]["type"] == node_type, nodes)
-        return list(map(lambda x: x[1], nodes))
+        return [self._fields(e) for e in self._types.get(node_type, {})]
 
     def search_by_id(self, node_id: str):
-        nodes = self.graph.nodes(data=True)
-        nodes = filter(lambda x: x[0] == node_id, nodes)
-        return list(map(lambda x: x[1], nodes))[0]
+        return self._fields(node_id) if node_id in self.graph else None
 
-    def _save(self, path: str):
-        import networkx as nx
-        nx.write_graphml(self.graph, path)
+    def search_by_ids(self, node_ids: List[str]):
+        nodes = self.graph.nodes
+        return [self._fields(e) if e in nodes else None for e in node_ids]
+
+    def _fields(self, node_id: str) -> dict:
+        return {k: v for k, v in self.graph.nodes[node_id].items() if k != _source_key}
+
+    def _index_node(self, node_id: str, fields: dict):
+        node_type = fields.get("type")
+        if node_type is not None:
+            self._types.setdefault(node_type, {})[node_id] = None
+
+    def _unindex_node(self, node_id: str):
+        node_type = self.graph.nodes[node_id].get("type")
+        self._types.get(node_type, {}).pop(node_id, None)
+
+    def _index_edge(self, source_id: str, target_id: str, edge_type: Optional[str]):
+        self._edges.setdefault(source_id, {}).setdefault(edge_type, {})[target_id] = None
+        self._edges.setdefault(target_id, {}).setdefault(edge_type, {})[source_id] = None
+
+    def _unindex_edge(self, source_id: str, target_id: str):
+        edge_type = self.graph.edges[source_id, target_id].get("type")
+        self._edges.get(source_id, {}).get(edge_type, {}).pop(target_id, None)
+        self._edges.get(target_id, {}).get(edge_type, {}).pop(source_id, None)
+
+
+def _is_graphml(path: str) -> bool:
+    return os.path.isfile(path) or path.endswith(".graphml")
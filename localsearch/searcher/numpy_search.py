@@ -0,0 +1,206 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Literal, Optional, Union
+
+import numpy as np
+
+from localsearch.__spi__ import Document, Encoder, ScoredDocument
+from localsearch.__util__.io_utils import read_json, write_json
+from localsearch.searcher.encoding import EncodingStage
+from localsearch.searcher.quantization import ProductQuantizer, Quantizer, ScalarQuantizer, search
+from localsearch.searcher.vector_search import VectorSearch
+
+
+@dataclass
+class NumpyConfig:
+    path: str
+    n: int = 5
+    index_name: Optional[str] = "numpy"
+    index_fields: Optional[List[str]] = field(default_factory=lambda: ["text"])
+    dtype: Literal["float32", "float16"] = "float32"
+    store_format: Literal["sqlite", "jsonl", "msgpack"] = "sqlite"
+    initial_capacity: int = 1024  # number of rows allocated for a new index, doubled whenever it is full
+    encode_batch_size: Optional[int] = None  # micro-batch size of the encoder calls, None encodes all at once
+    encode_workers: int = 1
+    # "int8" scans int8 codes (4x smaller), "pq" product quantization codes of pq_subvectors bytes per vector,
+    # a shortlist of rescore * n candidates is scored exactly on the float vectors
+    quantization: Optional[Literal["int8", "pq"]] = None
+    rescore: int = 4
+    pq_subvectors: int = 8
+    pq_min_train_size: int = 10_000  # live vectors needed to train the product quantizer, scanned exactly before
+
+
+class NumpySearch(VectorSearch):
+    """
+    Exact semantic search implementation which scores the query against all embeddings with a single matrix
+    multiplication. Meant for small and medium corpora where the approximation and the rebuild on write of
+    annoy do not pay off.
+
+    The embeddings are normalised once when they are appended and kept in a memory mapped .npy file, so the
+    returned score is the cosine similarity. Rows are never moved: appends write into the preallocated capacity
+    and removes only clear the live flag of the row, which makes both O(batch).
+
+    With `config.quantization` the scan runs over compressed codes held next to the float vectors, which are
+    only touched for the shortlist. The product quantizer is trained by the first append which brings the index to
+    `config.pq_min_train_size` live vectors, until then the vectors are scanned exactly. Call `train_quantizer` to
+    train it earlier or to retrain it once the index has grown.
+    """
+
+    kind = "numpy"
+
+    def __init__(self, config: NumpyConfig, encoder: Encoder, readonly: bool = False):
+        self.path = config.path + f"/{config.index_name}"
+        self.config = config
+        self.encoder = encoder
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self.codes: Optional[np.ndarray] = None
+
+        if os.path.exists(self.path + ".json"):
+            meta = read_json(self.path + ".json")
+            self.size = meta["size"]
+            mode = "r" if readonly else "r+"
+            self.vectors = np.lib.format.open_memmap(self.path + ".npy", mode=mode)
+            self.live = np.lib.format.open_memmap(self.path + ".live.npy", mode=mode)
+            self.quantizer = self._new_quantizer()
+            if self.quantizer is not None:
+                self.codes = np.lib.format.open_memmap(self.path + ".codes.npy", mode=mode)
+                if os.path.exists(self.path + ".pq.npy"):
+                    self.quantizer.load(self.path + ".pq.npy")
+        elif readonly:
+            raise ValueError(f"no numpy index found at {self.path}")
+        else:
+            self.size = 0
+            self.quantizer = self._new_quantizer()
+            self.vectors, self.live, self.codes = self._allocate(config.initial_capacity)
+            self._save()
+
+        self.store = self._open_index_store(self.path)
+        self._encoding = EncodingStage(encoder, config.encode_batch_size, config.encode_workers)
+
+    def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
+        return self._read_vectors(np.asarray([self.encoder(text)]), n or self.config.n)[0]
+
+    def read_batch(self, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+        if len(texts) == 0:
+            return []
+        return self._read_vectors(np.asarray(self.encoder(texts)), n or self.config.n)
+
+    def _read_vectors(self, queries: np.ndarray, n: int) -> List[List[ScoredDocument]]:
+        size, vectors, live, codes = self.size, self.vectors, self.live, self.codes
+        if size == 0:
+            return [[] for _ in queries]
+
+        queries = _normalize(queries.astype(np.float32))
+        if self.quantizer is None or not self.quantizer.trained:
+            matches = search(queries, vectors[:size], n, live=live[:size])
+        else:
+            matches = search(queries, vectors[:size], n, self.quantizer, codes[:size], self.config.rescore, live[:size])
+        return self._to_results([list(zip(indices.tolist(), scores.tolist())) for indices, scores in matches])
+
+    def append(self, documents: Union[Document, List[Document]]):
+        documents = documents if isinstance(documents, list) else [documents]
+
+        if len(documents) == 0:
+            return []
+
+        self._check_writable()
+        with self._lock:
+            idx = self.size
+            self._reserve(idx + len(documents))
+
+            for positions, vectors in self._encoding([self._to_text(d) for d in documents]):
+                rows = [idx + i for i in positions]
+                self.vectors[rows] = _normalize(np.asarray(vectors, dtype=np.float32))
+                self.live[rows] = True
+            self.store.put_many([(idx + i, document) for i, document in enumerate(documents)])
+
+            self.size = idx + len(documents)
+            if self.quantizer is not None and not self.quantizer.trained:
+                if np.count_nonzero(self.live[:self.size]) >= max(1, self.config.pq_min_train_size):
+                    self._train_quantizer()
+            elif self.quantizer is not None:
+                self.codes[idx:self.size] = self.quantizer.encode(self.vectors[idx:self.size].astype(np.float32))
+            self._save()
+
+    def train_quantizer(self):
+        """
+        Fits the quantizer on all live vectors and reencodes the index.
+        """
+        self._check_writable()
+        with self._lock:
+            self._train_quantizer()
+            self._save()
+
+    def _train_quantizer(self):
+        vectors = self.vectors[:self.size].astype(np.float32)
+        if not self.live[:self.size].any():
+            raise ValueError("no vectors to train the quantizer on")
+        self.quantizer.fit(vectors[self.live[:self.size]])
+        self.quantizer.save(self.path + ".pq.npy")
+        self.codes[:self.size] = self.quantizer.encode(vectors)
+
+    def remove(self, idx: str):
+        self._check_writable()
+        self._remove(self.store.ids_by_document(idx))
+
+    def remove_by_source(self, source: str):
+        self._check_writable()
+        self._remove(self.store.ids_by_source(source))
+
+    def _remove(self, idxs: List[int]):
+        with self._lock:
+            self.live[idxs] = False
+            self.store.delete_many(idxs)
+            self._save()
+
+    def _reserve(self, size: int):
+        """
+        Grows the embedding matrix by doubling its capacity until it fits the given number of rows.
+        """
+        capacity = len(self.live)
+        if size <= capacity:
+            return
+        capacity = max(capacity, 1)
+        while capacity < size:
+            capacity *= 2
+
+        arrays = self._allocate(capacity, ".tmp")
+        suffixes = [".npy", ".live.npy", ".codes.npy"]
+        for array, old, suffix in zip(arrays, [self.vectors, self.live, self.codes], suffixes):
+            if array is None:
+                continue
+            array[:self.size] = old[:self.size]
+            array.flush()
+            os.replace(self.path + suffix + ".tmp", self.path + suffix)
+        self.vectors, self.live, self.codes = arrays
+
+    def _allocate(self, capacity: int, suffix: str = ""):
+        os.makedirs(Path(self.path).parent, exist_ok=True)
+        dim = self.encoder.get_output_dim()
+        vectors = np.lib.format.open_memmap(self.path + ".npy" + suffix, "w+", self.config.dtype, (capacity, dim))
+        live = np.lib.format.open_memmap(self.path + ".live.npy" + suffix, "w+", np.bool_, (capacity,))
+        codes = None
+        if self.quantizer is not None:
+            width, dtype = self.quantizer.code_shape(dim)
+            codes = np.lib.format.open_memmap(self.path + ".codes.npy" + suffix, "w+", dtype, (capacity, width))
+        return vectors, live, codes
+
+    def _new_quantizer(self) -> Optional[Quantizer]:
+        if self.config.quantization == "int8":
+            return ScalarQuantizer()
+        if self.config.quantization == "pq":
+            return ProductQuantizer(self.config.pq_subvectors)
+        return None
+
+    def _save(self):
+        for array in [self.vectors, self.live, self.codes]:
+            if array is not None:
+                array.flush()
+        write_json(self.path + ".json", {"size": self.size, "dtype": self.config.dtype})
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class Quantizer(ABC):
+    """
+    Compresses normalised embeddings into small codes and approximates the inner product of queries and codes.
+    """
+
+    @property
+    @abstractmethod
+    def trained(self) -> bool:
+        pass
+
+    @abstractmethod
+    def code_shape(self, dim: int) -> Tuple[int, np.dtype]:
+        """
+        Returns the number of code elements per vector and their dtype.
+        """
+        pass
+
+    @abstractmethod
+    def fit(self, vectors: np.ndarray):
+        pass
+
+    @abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Returns the approximate inner products of shape (len(queries), len(codes)).
+        """
+        pass
+
+    def save(self, path: str):
+        pass
+
+    def load(self, path: str):
+        pass
+
+
+class ScalarQuantizer(Quantizer):
+    """
+    Maps every component of a normalised vector from [-1, 1] to an int8. Needs no training and cuts the memory
+    of float32 embeddings by 4x.
+    """
+
+    scale = 127.0
+
+    @property
+    def trained(self) -> bool:
+        return True
+
+    def code_shape(self, dim: int) -> Tuple[int, np.dtype]:
+        return dim, np.dtype(np.int8)
+
+    def fit(self, vectors: np.ndarray):
+        pass
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors * self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        return inner_products(queries, codes) / self.scale
+
+
+class ProductQuantizer(Quantizer):
+    """
+    Splits the vectors into `n_subvectors` parts and stores the id of the nearest of `n_centroids` k-means
+    centroids per part, i.e. one byte per part. The inner products are approximated with a lookup table
+    of query part and centroid products (asymmetric distance computation).
+    """
+
+    def __init__(self, n_subvectors: int = 8, n_centroids: int = 256, n_iter: int = 20, seed: int = 42):
+        if n_centroids > 256:
+            raise ValueError("at most 256 centroids are supported")
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.n_iter = n_iter
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (n_subvectors, n_centroids, dim / n_subvectors)
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    def code_shape(self, dim: int) -> Tuple[int, np.dtype]:
+        if dim % self.n_subvectors != 0:
+            raise ValueError(f"dimension {dim} is not divisible by {self.n_subvectors} subvectors")
+        return self.n_subvectors, np.dtype(np.uint8)
+
+    def fit(self, vectors: np.ndarray):
+        if len(vectors) == 0:
+            raise ValueError("no vectors to train the quantizer on")
+        rng = np.random.default_rng(self.seed)
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        self.codebooks = np.stack([_kmeans(e, self.n_centroids, self.n_iter, rng) for e in parts])
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = [_nearest(part, codebook) for part, codebook in zip(parts, self.codebooks)]
+        return np.stack(codes, axis=1).astype(np.uint8)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # (n_queries, n_subvectors, n_centroids) table of the inner products of the query parts and centroids
+        tables = np.einsum("msd,scd->msc", self._split(queries).transpose(1, 0, 2), self.codebooks)
+        subvectors = np.arange(self.n_subvectors)
+        return np.stack([table[subvectors, codes].sum(axis=1) for table in tables])
+
+    def save(self, path: str):
+        np.save(path, self.codebooks)
+
+    def load(self, path: str):
+        self.codebooks = np.load(path)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Returns the parts of the vectors with shape (n_subvectors, len(vectors), dim / n_subvectors).
+        """
+        return vectors.reshape(len(vectors), self.n_subvectors, -1).transpose(1, 0, 2)
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(vectors: np.ndarray, k: int, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = vectors[rng.choice(len(vectors), min(k, len(vectors)), replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        counts = np.bincount(assignment, minlength=len(centroids))
+        # empty clusters keep their previous centroid
+        centroids[counts > 0] = sums[counts > 0] / counts[counts > 0, None]
+    return centroids
+
+
+def inner_products(queries: np.ndarray, vectors: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """
+    Returns the float32 inner products of the queries and the vectors. Vectors of another dtype (float16, int8)
+    are converted chunk by chunk, so a query never copies the whole matrix.
+    """
+    if vectors.dtype == np.float32:
+        return queries @ vectors.T
+    scores = np.empty((len(queries), len(vectors)), dtype=np.float32)
+    for i in range(0, len(vectors), chunk_size):
+        scores[:, i:i + chunk_size] = queries @ vectors[i:i + chunk_size].astype(np.float32).T
+    return scores
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Returns the indices of the k highest finite scores in descending order.
+    """
+    if k <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return candidates[scores[candidates] != -np.inf]
+
+
+def search(
+        queries: np.ndarray,
+        vectors: np.ndarray,
+        k: int,
+        quantizer: Optional[Quantizer] = None,
+        codes: Optional[np.ndarray] = None,
+        rescore: int = 4,
+        live: Optional[np.ndarray] = None
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Returns the indices and inner products of the k nearest vectors of every normalised query. With a quantizer
+    the codes are scanned first and only a shortlist of `rescore * k` candidates is scored on the float vectors.
+    """
+    if quantizer is None:
+        scores = inner_products(queries, vectors)
+    else:
+        scores = quantizer.scores(queries, codes)
+    if live is not None:
+        scores[:, ~live] = -np.inf
+
+    results = []
+    for query, row in zip(queries, scores):
+        if quantizer is None:
+            indices = top_k(row, k)
+            results.append((indices, row[indices]))
+            continue
+        shortlist = np.sort(top_k(row, k * rescore))
+        exact = vectors[shortlist].astype(np.float32) @ query
+        order = top_k(exact, k)
+        results.append((shortlist[order], exact[order]))
+    return results
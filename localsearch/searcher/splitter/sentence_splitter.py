@@ -1,9 +1,12 @@
 from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Protocol
+from typing import Iterable, Iterator, List, Optional, Protocol
 
 from localsearch import Document
 from localsearch.__spi__.types import DocumentSplitter, Lang
+from localsearch.__util__.array_utils import chunk
+from localsearch.__util__.string_utils import get_segmenter
 
 
 class TextMerger(Protocol):
@@ -26,25 +29,47 @@ class PrefixAwareTextMerger(TextMerger):
 
 @dataclass
 class SentenceSplitter(DocumentSplitter):
+    """
+    Splits a document into overlapping chunks of `chunk_size` sentences. Every chunk stores the character offset
+    of its first sentence in the original text in the `text_start_idx_field`, unless the field is None.
+    """
     text_field: str = "text"
     lang: Lang = "en"
     chunk_size: int = 3
     window_size: int = 1
-    text_merger: TextMerger = lambda _, e: e
+    text_merger: Optional[TextMerger] = None
+    text_start_idx_field: Optional[str] = "text_start_idx"
 
     def __call__(self, document: Document) -> List[Document]:
-        import pysbd
-        segmenter = pysbd.Segmenter(language=self.lang, clean=False)
-        sentences = segmenter.segment(document.fields[self.text_field])
+        text = document.fields[self.text_field]
+        spans = get_segmenter(self.lang).segment(text)
+        sentences = [e.sent for e in spans]
 
-        def split_document(i: int, new_text: str):
-            new_document = Document(id=document.id, source=document.source, fields={**document.fields})
-            new_document.id += f"#{i}"
+        def split_document(i: int, start: int):
+            new_text = " ".join(sentences[start:start + self.chunk_size])
+            if self.text_merger is not None:
+                new_text = self.text_merger(text, new_text)
 
-            old_text = new_document.fields[self.text_field]
-            new_document.fields[self.text_field] = self.text_merger(old_text, new_text)
-            return new_document
+            fields = {**document.fields, self.text_field: new_text}
+            if self.text_start_idx_field is not None:
+                fields[self.text_start_idx_field] = spans[start].start
+            return Document(id=f"{document.id}#{i}", source=document.source, fields=fields)
 
-        results = [i for i in range(0, len(sentences), self.chunk_size - self.window_size)]
-        results = [sentences[i:i + self.chunk_size] for i in results]
-        return [split_document(i, " ".join(e)) for i, e in enumerate(results)]
+        starts = range(0, len(sentences), self.chunk_size - self.window_size)
+        return [split_document(i, start) for i, start in enumerate(starts)]
+
+    def split_many(self, documents: Iterable[Document], workers: int = 1, batch_size: int = 256) -> Iterator[Document]:
+        """
+        Lazily splits the documents and yields the chunks in document order. With more than one worker the
+        documents are split in batches of `batch_size` on a process pool.
+        """
+        if workers <= 1:
+            for document in documents:
+                yield from self(document)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for batch in chunk(documents, batch_size):
+                chunksize = max(1, len(batch) // workers)
+                for chunks in executor.map(self, batch, chunksize=chunksize):
+                    yield from chunks
@@ -1,11 +1,13 @@
 import json
 import os
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import List, Union, Optional
+from typing import List, Literal, Union, Optional
 
 from localsearch.__spi__ import ScoredDocument, Document, Lang, IndexedDocument
 from localsearch.__spi__.types import Searcher
-from localsearch.__util__.string_utils import remove_punctuation, lemmatize, remove_stopwords
+from localsearch.__util__.string_utils import get_canonicalizer
 
 
 @dataclass
@@ -16,9 +18,27 @@ class TantivyConfig:
     saturation: float = field(default_factory=lambda: 0)
     index_name: str = field(default_factory=lambda: "tantivy")
     index_fields: List[str] = field(default_factory=lambda: ["text"])
+    # "commit" refreshes the searcher after commits of this instance, "interval" every reload_interval seconds
+    # (e.g. if other processes write to the index) and "manual" only on refresh()
+    reload_policy: Literal["commit", "interval", "manual"] = "commit"
+    reload_interval: float = 1.0
+    writer_heap_size: int = 128_000_000
+    writer_num_threads: int = 0  # 0 lets tantivy choose the number of threads
+    # keep one writer open and commit once one of the thresholds is reached (or on flush())
+    buffered: bool = False
+    commit_docs: Optional[int] = 1000
+    commit_bytes: Optional[int] = None
+    commit_interval: Optional[float] = None  # seconds
 
 
 class TantivySearch(Searcher):
+    """
+    Fulltext search implementation which is based on the tantivy library (https://github.com/quickwit-oss/tantivy)
+
+    Reads share a cached searcher which is refreshed according to `config.reload_policy`. If `config.buffered` is
+    set, a single writer is kept open and adds and deletes are grouped into one commit until a document count,
+    byte size or time threshold is reached or flush() is called.
+    """
 
     # noinspection PyUnresolvedReferences
     def __init__(self, config: TantivyConfig, readonly: bool = False):
@@ -39,28 +59,40 @@ class TantivySearch(Searcher):
             self.TantivyDocument = tantivy.Document
             self.index = tantivy.Index(schema, path=config.path, readonly=readonly)
             self.config = config
+            self._searcher = None
+            self._searcher_lock = threading.Lock()
+            self._last_reload = 0.0
+            self._writer = None
+            self._writer_lock = threading.RLock()
+            self._pending_docs = 0
+            self._pending_bytes = 0
+            self._commit_timer: Optional[threading.Timer] = None
         except ImportError:
             raise ValueError("no tantivy library found, please install localsearch[tantivy]")
 
     def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
-        # Reload the index to ensure it points to the last commit.
-        self.index.reload()
-        searcher = self.index.searcher()
+        return self.read_batch([text], n)[0]
+
+    def read_batch(self, texts: List[str], n: Optional[int] = None) -> List[List[ScoredDocument]]:
+        searcher = self._get_searcher()
 
         def _saturation(value):
             return value / (value + self.config.saturation)
 
-        query = self._canonicalize(text)
-        query = self.index.parse_query(query, ["text"])
-        results = searcher.search(query, n or self.config.n).hits
-        results = [(_saturation(result[0]), searcher.doc(result[1])) for result in results]
+        def _read(text: str):
+            query = self._canonicalize(text)
+            query = self.index.parse_query(query, ["text"])
+            results = searcher.search(query, n or self.config.n).hits
+            results = [(_saturation(result[0]), searcher.doc(result[1])) for result in results]
 
-        return [ScoredDocument(result[0], IndexedDocument(
-            id=result[1]["id"][0],
-            source=result[1]["source"][0],
-            index=self.config.index_name,
-            fields=result[1].to_dict()["fields"][0]
-        )) for result in results]
+            return [ScoredDocument(result[0], IndexedDocument(
+                id=result[1]["id"][0],
+                source=result[1]["source"][0],
+                index=self.config.index_name,
+                fields=result[1].to_dict()["fields"][0]
+            )) for result in results]
+
+        return [_read(text) for text in texts]
 
     def append(self, documents: Union[Document, List[Document]]):
         documents = documents if isinstance(documents, list) else [documents]
@@ -68,21 +100,98 @@ class TantivySearch(Searcher):
         if len(documents) == 0:
             return
 
-        writer = self.index.writer()
-        for document in documents:
-            text = self._canonicalize(" ".join([document.fields[e] for e in self.config.index_fields]))
+        texts = [" ".join([document.fields[e] for e in self.config.index_fields]) for document in documents]
+        texts = get_canonicalizer(self.config.lang).canonicalize_many(texts)
 
-            # noinspection PyArgumentList
-            tantivy_document = self.TantivyDocument(id=document.id, source=document.source, text=text)
-            tantivy_document.add_json("fields", json.dumps(document.fields))
-            writer.add_document(tantivy_document)
+        with self._writer_lock:
+            writer = self._get_writer()
+            n_bytes = 0
+            for document, text in zip(documents, texts):
+                fields = json.dumps(document.fields)
+                n_bytes += len(text) + len(fields)
 
-        writer.commit()
+                # noinspection PyArgumentList
+                tantivy_document = self.TantivyDocument(id=document.id, source=document.source, text=text)
+                tantivy_document.add_json("fields", fields)
+                writer.add_document(tantivy_document)
+
+            self._written(writer, len(documents), n_bytes)
 
     def remove(self, idx: str):
-        writer = self.index.writer()
-        writer.delete_documents("id", idx)
+        with self._writer_lock:
+            writer = self._get_writer()
+            writer.delete_documents("id", idx)
+            self._written(writer, 1, 0)
+
+    def flush(self):
+        """
+        Commits the pending operations of the buffered writer.
+        """
+        with self._writer_lock:
+            if self._commit_timer is not None:
+                self._commit_timer.cancel()
+                self._commit_timer = None
+            if self._writer is not None and self._pending_docs > 0:
+                self._commit(self._writer)
+            self._pending_docs = 0
+            self._pending_bytes = 0
+
+    def close(self):
+        """
+        Flushes and releases the buffered writer.
+        """
+        with self._writer_lock:
+            self.flush()
+            self._writer = None
+
+    def refresh(self):
+        """
+        Reloads the index and replaces the cached searcher so that it points to the last commit.
+        """
+        with self._searcher_lock:
+            self._reload()
+
+    def _get_searcher(self):
+        with self._searcher_lock:
+            expired = time.monotonic() - self._last_reload >= self.config.reload_interval
+            if self._searcher is None or (self.config.reload_policy == "interval" and expired):
+                self._reload()
+            return self._searcher
+
+    def _reload(self):
+        self.index.reload()
+        self._searcher = self.index.searcher()
+        self._last_reload = time.monotonic()
+
+    def _get_writer(self):
+        if not self.config.buffered:
+            return self.index.writer(self.config.writer_heap_size, self.config.writer_num_threads)
+        if self._writer is None:
+            self._writer = self.index.writer(self.config.writer_heap_size, self.config.writer_num_threads)
+        return self._writer
+
+    def _written(self, writer, n_docs: int, n_bytes: int):
+        if not self.config.buffered:
+            return self._commit(writer)
+
+        self._pending_docs += n_docs
+        self._pending_bytes += n_bytes
+
+        if (
+            (self.config.commit_docs is not None and self._pending_docs >= self.config.commit_docs)
+            or (self.config.commit_bytes is not None and self._pending_bytes >= self.config.commit_bytes)
+        ):
+            self.flush()
+        elif self.config.commit_interval is not None and self._commit_timer is None:
+            self._commit_timer = threading.Timer(self.config.commit_interval, self.flush)
+            self._commit_timer.daemon = True
+            self._commit_timer.start()
+
+    def _commit(self, writer):
         writer.commit()
+        if self.config.reload_policy == "commit":
+            with self._searcher_lock:
+                self._searcher = None
 
     def _canonicalize(self, text: str):
         """
@@ -91,31 +200,10 @@ class TantivySearch(Searcher):
         :param text:
         :return: str
         """
-        text = remove_punctuation(text)
-        text = remove_stopwords(text, self.config.lang)
-        text = lemmatize(text, self.config.lang)
-        text = text.replace("+", " ")
-        text = text.replace("-", " ")
-        text = text.replace("^", " ")
-        text = text.replace("`", " ")
-        text = text.replace(":", " ")
-        text = text.replace("{", " ")
-        text = text.replace("}", " ")
-        text = text.replace('"', " ")
-        text = text.replace("[", " ")
-        text = text.replace("]", " ")
-        text = text.replace("(", " ")
-        text = text.replace(")", " ")
-        text = text.replace("~", " ")
-        text = text.replace("!", " ")
-        text = text.replace("*", " ")
-        text = text.replace("\\", " ")
-        return text
+        return get_canonicalizer(self.config.lang)(text)
 
     def search_by_source(self, source: str, n: Optional[int] = None) -> List[Document]:
-        # Reload the index to ensure it points to the last commit.
-        self.index.reload()
-        searcher = self.index.searcher()
+        searcher = self._get_searcher()
 
         query = self.index.parse_query(source, ["source"])
         results = searcher.search(query, n or self.config.n).hits
@@ -128,6 +216,7 @@ class TantivySearch(Searcher):
         ) for result in results]
 
     def remove_by_source(self, source: str):
-        writer = self.index.writer()
-        writer.delete_documents("source", source)
-        writer.commit()
+        with self._writer_lock:
+            writer = self._get_writer()
+            writer.delete_documents("source", source)
+            self._written(writer, 1, 0)
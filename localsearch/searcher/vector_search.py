@@ -0,0 +1,71 @@
+from dataclasses import asdict
+from typing import Any, List, Optional, Tuple
+
+from localsearch.__spi__ import Document, IndexedDocument, ScoredDocument
+from localsearch.__spi__.types import Searcher
+from localsearch.document_store import DocumentStore, SqliteDocumentStore, open_document_store
+from localsearch.searcher.encoding import EncodeStats, EncodingStage
+
+
+class VectorSearch(Searcher):
+    """
+    Base class of the semantic searchers which keep the embeddings under the integer indices of a document store
+    (AnnoySearch, NumpySearch). Subclasses set `config`, `readonly`, `store` and `_encoding` and name themselves in
+    `kind` for the error messages.
+    """
+
+    kind: str
+    config: Any
+    readonly: bool
+    store: DocumentStore
+    _encoding: EncodingStage
+
+    @property
+    def encode_stats(self) -> EncodeStats:
+        """
+        Number of documents, micro-batches and seconds spent by the encoding stage of the last append.
+        """
+        return self._encoding.stats
+
+    def search_by_source(self, source: str, n: Optional[int] = None) -> List[Document]:
+        return self.store.get_by_source(source, n)
+
+    def close(self):
+        """
+        Releases the worker pool of the encoding stage.
+        """
+        self._encoding.close()
+
+    def _to_results(self, hits: List[List[Tuple[int, float]]]) -> List[List[ScoredDocument]]:
+        """
+        Turns the (index, score) hits of every query into scored documents, hits without document are dropped.
+        """
+        # resolve the documents of all queries with a single lookup
+        documents = iter(self._read_documents([idx for e in hits for idx, _ in e]))
+        results = [[ScoredDocument(score, next(documents)) for _, score in e] for e in hits]
+        return [[e for e in result if e.document is not None] for result in results]
+
+    def _read_documents(self, idxs: List[int]) -> List[Optional[IndexedDocument]]:
+        documents = self.store.get_many(idxs)
+
+        def to_indexed_document(document: Optional[Document]):
+            if document is None:
+                return None
+            return IndexedDocument(**asdict(document), index=self.config.index_name)
+
+        return [to_indexed_document(e) for e in documents]
+
+    def _open_index_store(self, path: str) -> DocumentStore:
+        """
+        Opens the document store of the index, a sqlite file at path.db or a record log at path.docs.
+        """
+        if self.config.store_format != "sqlite":
+            return open_document_store(path + ".docs", self.config.store_format, self.readonly)
+        return SqliteDocumentStore(path + ".db", self.readonly)
+
+    def _check_writable(self):
+        if self.readonly:
+            raise ValueError(f"{self.kind} index is opened readonly")
+
+    def _to_text(self, document: Document) -> str:
+        return " ".join([document.fields[e] for e in self.config.index_fields])
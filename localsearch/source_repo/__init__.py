@@ -1,3 +1,6 @@
+from .cached_source_repo import CachedSourceRepo
 from .file_system_source_repo import FileSystemSourceRepo
+from .source_repo import SourceRepo
+from .sqlite_source_repo import SqliteSourceRepo
 
-__all__ = [FileSystemSourceRepo]
+__all__ = [CachedSourceRepo, FileSystemSourceRepo, SourceRepo, SqliteSourceRepo]
@@ -0,0 +1,54 @@
+from typing import Any, Callable, List, Optional
+
+from localsearch.__spi__ import Cache
+from localsearch.__spi__.model import Source, StructuredSource, TextSource
+from localsearch.cache import LRUCache
+from localsearch.source_repo.source_repo import SourceRepo
+
+
+def sizeof_source(source: Source) -> int:
+    """
+    Approximates the memory of a parsed source by the length of its texts plus a fixed overhead per object.
+    """
+    size = 100 + len(source.id)
+    if isinstance(source, TextSource):
+        size += len(source.text) + len(source.title or "")
+    if isinstance(source, StructuredSource):
+        size += len(source.title) + sum(100 + len(e.text) + len(e.title or "") for e in source.parts)
+    return size
+
+
+class CachedSourceRepo(SourceRepo):
+    """
+    Source repository wrapper which keeps the parsed sources in an LRU cache. By default the cache holds at most
+    `max_bytes` bytes of sources as estimated by `sizeof`. Only the sources missing in the cache are loaded, all of
+    them with a single call of the wrapped repository. `get_part` and `get_title` load and cache the whole
+    source.
+    """
+
+    def __init__(
+            self,
+            repo: SourceRepo,
+            cache: Optional[Cache] = None,
+            max_bytes: int = 256_000_000,
+            sizeof: Callable[[Any], int] = sizeof_source
+    ):
+        self.repo = repo
+        self.cache = cache if cache is not None else LRUCache(max_size=None, max_bytes=max_bytes, sizeof=sizeof)
+
+    def add(self, source: Source) -> None:
+        self.repo.add(source)
+        self.cache.delete(source.id)
+
+    def get(self, id: str) -> Source:
+        return self.get_many([id])[0]
+
+    def get_many(self, ids: List[str]) -> List[Source]:
+        sources = [self.cache.get(id) for id in ids]
+        missing = list(dict.fromkeys(id for id, e in zip(ids, sources) if e is None))
+        if len(missing) > 0:
+            loaded = dict(zip(missing, self.repo.get_many(missing)))
+            for id, source in loaded.items():
+                self.cache.put(id, source)
+            sources = [e if e is not None else loaded[id] for id, e in zip(ids, sources)]
+        return sources
@@ -1,9 +1,9 @@
 from dataclasses import asdict
 from pathlib import Path
 
-from localsearch.__spi__.model import Source, SourcePart, StructuredSource, TextSource
+from localsearch.__spi__.model import Source
 from localsearch.__util__.io_utils import read_json, write_json
-from localsearch.source_repo.source_repo import SourceRepo
+from localsearch.source_repo.source_repo import SourceRepo, parse_source
 
 
 class FileSystemSourceRepo(SourceRepo):
@@ -15,13 +15,4 @@ class FileSystemSourceRepo(SourceRepo):
         write_json(Path(self._source_dir) / f"{source.id}.json", asdict(source))
 
     def get(self, id: str) -> Source:
-        source = read_json(Path(self._source_dir) / f"{id}.json")
-        type = source.get("type")
-
-        if type == "TextSource":
-            return TextSource(**source)
-        elif type == "StructuredSource":
-            parts = [SourcePart(**part) for part in source.pop("parts")]
-            return StructuredSource(**source, parts=parts)
-
-        return Source(**source)
+        return parse_source(read_json(Path(self._source_dir) / f"{id}.json"))
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import List, Optional
 
-from localsearch.__spi__.model import Source
+from localsearch.__spi__.model import Source, SourcePart, StructuredSource, TextSource
 
 
 class SourceRepo(ABC):
@@ -12,3 +13,27 @@ class SourceRepo(ABC):
     @abstractmethod
     def get(self, id: str) -> Source:
         pass
+
+    def get_many(self, ids: List[str]) -> List[Source]:
+        return [self.get(id) for id in ids]
+
+    def get_title(self, id: str) -> Optional[str]:
+        return getattr(self.get(id), "title", None)
+
+    def get_part(self, id: str, part: int) -> SourcePart:
+        source = self.get(id)
+        if not isinstance(source, StructuredSource) or not 0 <= part < len(source.parts):
+            raise KeyError(f"no part {part} found for the source {id}")
+        return source.parts[part]
+
+
+def parse_source(source: dict) -> Source:
+    type = source.get("type")
+
+    if type == "TextSource":
+        return TextSource(**source)
+    elif type == "StructuredSource":
+        parts = [SourcePart(**part) for part in source.pop("parts")]
+        return StructuredSource(**source, parts=parts)
+
+    return Source(**source)
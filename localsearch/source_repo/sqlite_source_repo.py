@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional
+
+from localsearch.__spi__.model import Source, SourcePart, StructuredSource
+from localsearch.__util__.sqlite_utils import select_in
+from localsearch.source_repo.source_repo import SourceRepo, parse_source
+
+
+class SqliteSourceRepo(SourceRepo):
+    """
+    Source repository which is backed by a single sqlite file. The parts of a structured source are stored in
+    separate rows, so that a single part can be read without loading the whole source.
+    """
+
+    def __init__(self, path: str) -> None:
+        if not os.path.exists(Path(path).parent):
+            os.makedirs(Path(path).parent)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS sources (id TEXT PRIMARY KEY, data TEXT)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS parts (source_id TEXT, idx INTEGER, data TEXT, PRIMARY KEY (source_id, idx))"
+        )
+        self._connection.commit()
+
+    def add(self, source: Source) -> None:
+        data = asdict(source)
+        parts = data.pop("parts", [])
+
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO sources VALUES (?, ?)", (source.id, json.dumps(data)))
+            self._connection.execute("DELETE FROM parts WHERE source_id = ?", (source.id,))
+            self._connection.executemany(
+                "INSERT INTO parts VALUES (?, ?, ?)",
+                [(source.id, i, json.dumps(part)) for i, part in enumerate(parts)]
+            )
+            self._connection.commit()
+
+    def get(self, id: str) -> Source:
+        return self.get_many([id])[0]
+
+    def get_many(self, ids: List[str]) -> List[Source]:
+        if len(ids) == 0:
+            return []
+
+        with self._lock:
+            sources = select_in(self._connection, "SELECT id, data FROM sources WHERE id IN ({})", ids)
+            parts = select_in(
+                self._connection, "SELECT source_id, data FROM parts WHERE source_id IN ({}) ORDER BY source_id, idx",
+                ids
+            )
+
+        data = {id: json.loads(e) for id, e in sources}
+        for source_id, part in parts:
+            data[source_id].setdefault("parts", []).append(json.loads(part))
+        for e in data.values():
+            if e.get("type") == StructuredSource.type:
+                e.setdefault("parts", [])
+
+        missing = [id for id in ids if id not in data]
+        if len(missing) > 0:
+            raise KeyError(f"no sources found with the ids {missing}")
+        return [parse_source(dict(data[id])) for id in ids]
+
+    def get_title(self, id: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT data FROM sources WHERE id = ?", (id,)).fetchone()
+
+        if row is None:
+            raise KeyError(f"no source found with the id {id}")
+        return json.loads(row[0]).get("title")
+
+    def get_part(self, id: str, part: int) -> SourcePart:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM parts WHERE source_id = ? AND idx = ?", (id, part)
+            ).fetchone()
+
+        if row is None:
+            raise KeyError(f"no part {part} found for the source {id}")
+        return SourcePart(**json.loads(row[0]))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -1,6 +1,8 @@
+from bisect import bisect_right, insort
 from dataclasses import dataclass
 
-from localsearch.__spi__.model import RankedDocument, StructuredSource
+from localsearch.__spi__.model import RankedDocument, SourcePart, StructuredSource
+from localsearch.source_repo.source_repo import SourceRepo
 
 
 @dataclass
@@ -19,32 +21,47 @@ def filter_common_context(
         source_part_field: str = "source_part",
         text_start_idx_field: str = "text_start_idx"
 ) -> list[RankedDocument]:
-
-    context_spans: list[ContextSpan] = []
+    """
+    Drops every result which starts within the context span (start - chars_before, start + chars_after) of a
+    previous result of the same source part. The accepted starts are kept sorted per source part, so every
+    result is checked with a single binary search.
+    """
+    starts: dict[tuple[str, int | None], list[int]] = {}
     filtered_results = []
     for res in results:
-        source_id = res.document.fields[source_id_field]
-        source_part = res.document.fields.get(source_part_field)
+        key = (res.document.fields[source_id_field], res.document.fields.get(source_part_field))
         text_start_idx = res.document.fields[text_start_idx_field]
-        in_existing_context = False
-        for cs in context_spans:
-            if (
-                source_id == cs.source_id
-                and source_part == source_part
-                and cs.start_idx < text_start_idx < cs.end_idx
-            ):
-                in_existing_context = True
-                break
-
-        if not in_existing_context:
-            context_spans.append(
-                ContextSpan(source_id, source_part, text_start_idx-chars_before, text_start_idx+chars_after)
-            )
-            filtered_results.append(res)
+
+        # a previous start t covers the result if text_start_idx - chars_after < t < text_start_idx + chars_before
+        accepted = starts.setdefault(key, [])
+        i = bisect_right(accepted, text_start_idx - chars_after)
+        if i < len(accepted) and accepted[i] < text_start_idx + chars_before:
+            continue
+
+        insort(accepted, text_start_idx)
+        filtered_results.append(res)
 
     return filtered_results
 
 
+def filter_common_context_batch(
+        results: list[list[RankedDocument]],
+        chars_before: int,
+        chars_after: int,
+        source_id_field: str = "source_id",
+        source_part_field: str = "source_part",
+        text_start_idx_field: str = "text_start_idx"
+) -> list[list[RankedDocument]]:
+    """
+    Convenience wrapper which applies filter_common_context to the results of every query. The queries are
+    filtered independently, a result is only dropped in favour of a result of the same query.
+    """
+    return [
+        filter_common_context(e, chars_before, chars_after, source_id_field, source_part_field, text_start_idx_field)
+        for e in results
+    ]
+
+
 def get_full_context(
         result: RankedDocument,
         source: StructuredSource,
@@ -59,12 +76,63 @@ def get_full_context(
     source_part: int = result.document.fields[source_part_field]
     text_start_idx: int = result.document.fields[text_start_idx_field]
 
-    part = source.parts[source_part]
+    return _format_context(
+        source.title,
+        source.parts[source_part],
+        text_start_idx,
+        chars_before,
+        chars_after,
+        doc_title_prefix,
+        section_title_prefix
+    )
+
+
+def get_full_contexts(
+        results: list[RankedDocument],
+        repo: SourceRepo,
+        chars_before: int,
+        chars_after: int,
+        source_id_field: str = "source_id",
+        source_part_field: str = "source_part",
+        text_start_idx_field: str = "text_start_idx",
+        doc_title_prefix: str = "Document title:",
+        section_title_prefix: str = "Section title:"
+) -> list[str]:
+    """
+    Returns the full context of every result. Only the parts of the results and the titles of their sources are
+    read from the repository, each of them once.
+    """
+    keys = [(e.document.fields[source_id_field], e.document.fields[source_part_field]) for e in results]
+    parts = {key: repo.get_part(*key) for key in dict.fromkeys(keys)}
+    titles = {id: repo.get_title(id) for id in dict.fromkeys(id for id, _ in keys)}
+    return [
+        _format_context(
+            titles[key[0]],
+            parts[key],
+            e.document.fields[text_start_idx_field],
+            chars_before,
+            chars_after,
+            doc_title_prefix,
+            section_title_prefix
+        )
+        for key, e in zip(keys, results)
+    ]
+
+
+def _format_context(
+        title: str | None,
+        part: SourcePart,
+        text_start_idx: int,
+        chars_before: int,
+        chars_after: int,
+        doc_title_prefix: str,
+        section_title_prefix: str
+) -> str:
     start_idx = max(0, text_start_idx-chars_before)
     end_idx = text_start_idx+chars_after
     text = part.text[start_idx: end_idx]
-    title = ""
-    title += f"{doc_title_prefix} {source.title}.\n\n" if source.title.strip() else ""
-    title += f"{section_title_prefix} {part.title}.\n\n" if part.title.strip() else ""
+    prefix = ""
+    prefix += f"{doc_title_prefix} {title}.\n\n" if title and title.strip() else ""
+    prefix += f"{section_title_prefix} {part.title}.\n\n" if part.title and part.title.strip() else ""
 
-    return f"{title}{text}"
+    return f"{prefix}{text}"
@@ -47,7 +47,11 @@ setup(
             "pysbd==0.3.4"
         ],
         'networkx': [
-            "networkx==3.1"
+            "networkx==3.1",
+            "scipy"
+        ],
+        'msgpack': [
+            "msgpack"
         ]
     }
 )
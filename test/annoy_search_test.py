@@ -85,3 +85,118 @@ class AnnoySearcherTest(TestCase):
 
         results = searcher.read("Beispiel Text")
         assert len(results) == 0
+
+    def test_segmented_index(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        config = AnnoyConfig(path=tempdir, segmented=True, max_delta_size=3, background_compaction=False)
+        searcher = AnnoySearch(config, DummyEncoder())
+
+        searcher.append(Document("abcd1", "source", {"text": "Beispiel Text"}))
+        searcher.append(Document("abcd2", "source", {"text": "Beispiel Text"}))
+
+        results = searcher.read("Beispiel Text")
+        assert len(results) == 2
+        assert results[0].score == 1
+
+        # third pending change triggers the compaction into a sealed index
+        searcher.append(Document("abcd3", "source", {"text": "Beispiel Text"}))
+        assert len(searcher._delta) == 0
+        searcher.append(Document("abcd4", "source2", {"text": "Beispiel Text"}))
+        searcher.remove("abcd1")
+
+        results = searcher.read("Beispiel Text")
+        assert len(results) == 3
+        assert "abcd1" not in [e.document.id for e in results]
+
+        searcher = AnnoySearch(config, DummyEncoder())
+        results = searcher.read("Beispiel Text")
+        assert len(results) == 3
+
+        searcher.remove_by_source("source")
+        results = searcher.read("Beispiel Text")
+        assert [e.document.id for e in results] == ["abcd4"]
+
+        searcher = AnnoySearch(AnnoyConfig(path=tempdir, index_name="plain"), DummyEncoder())
+        self.assertRaises(ValueError, searcher.compact)
+
+    def test_metric_scoring(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        config = AnnoyConfig(path=tempdir, metric="angular")
+        searcher = AnnoySearch(config, DummyEncoder())
+        searcher.append(Document("abcd1", "source", {"text": "Beispiel Text"}))
+        assert searcher.read("Beispiel Text")[0].score == 1
+
+        config = AnnoyConfig(path=tempdir, metric="angular", scoring=lambda x: 1 - x)
+        searcher = AnnoySearch(config, DummyEncoder())
+        assert searcher.read("Beispiel Text")[0].score == 1
+
+    def test_read_batch(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        searcher = AnnoySearch(AnnoyConfig(path=tempdir), DummyEncoder())
+        searcher.append([Document("abcd1", "source", {"text": "Beispiel Text"}),
+                         Document("abcd2", "source", {"text": "Beispiel Text"})])
+
+        results = searcher.read_batch(["Beispiel", "Text", "Beispiel Text"], n=1)
+        assert [len(e) for e in results] == [1, 1, 1]
+        assert results[0][0].score == 1
+
+    def test_micro_batched_encoding(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        config = AnnoyConfig(path=tempdir, encode_batch_size=2, encode_workers=2)
+        searcher = AnnoySearch(config, DummyEncoder())
+        searcher.append([Document(f"abcd{i}", "source", {"text": "Beispiel" * i}) for i in range(5)])
+
+        assert searcher.encode_stats.documents == 5
+        assert searcher.encode_stats.batches == 3
+        assert len(searcher.read("Beispiel Text", n=10)) == 5
+
+        searcher.close()
+        assert searcher._encoding._pool is None
+        searcher.append(Document("abcd5", "source", {"text": "Beispiel"}))
+        assert len(searcher.read("Beispiel Text", n=10)) == 6
+
+    def test_on_disk_build(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        config = AnnoyConfig(path=tempdir, on_disk_build=True, n_jobs=2)
+        searcher = AnnoySearch(config, DummyEncoder())
+        searcher.append([Document(f"abcd{i}", "source", {"text": "Beispiel Text"}) for i in range(3)])
+        searcher.append(Document("abcd3", "source", {"text": "Beispiel Text"}))
+
+        assert searcher.build_stats.n_items == 4
+        assert len(searcher.read("Beispiel Text")) == 4
+        assert len(AnnoySearch(config, DummyEncoder()).read("Beispiel Text")) == 4
+
+    def test_readonly(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        for store_format in ["sqlite", "jsonl"]:
+            config = AnnoyConfig(path=tempdir, index_name=store_format, store_format=store_format, prefault=True)
+            AnnoySearch(config, DummyEncoder()).append(
+                [Document(f"abcd{i}", "source", {"text": "Beispiel Text"}) for i in range(3)])
+
+            searcher = AnnoySearch(config, DummyEncoder(), readonly=True)
+            assert len(searcher.read("Beispiel Text")) == 3
+            with self.assertRaises(ValueError):
+                searcher.append(Document("abcd3", "source", {"text": "Beispiel Text"}))
+            with self.assertRaises(ValueError):
+                searcher.remove("abcd0")
+
+        with self.assertRaises(ValueError):
+            AnnoySearch(AnnoyConfig(path=tempdir, index_name="missing"), DummyEncoder(), readonly=True)
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from localsearch.__spi__ import Document, ScoredDocument
+from localsearch.__util__.array_utils import take_unique, top_k, unique
+
+
+def scored(score: float, key: str) -> ScoredDocument:
+    return ScoredDocument(score, Document(key, "source", {"text": key}))
+
+
+class ArrayUtilsTest(TestCase):
+    documents = [scored(0.2, "a"), scored(0.9, "b"), scored(0.5, "a"), scored(0.7, "c"), scored(0.1, "d")]
+
+    def test_top_k(self):
+        self.assertEqual([e.score for e in top_k(self.documents, 2)], [0.9, 0.7])
+
+    def test_unique(self):
+        results = unique(self.documents, lambda x: x.document.id)
+        self.assertEqual([(e.document.id, e.score) for e in results], [("b", 0.9), ("c", 0.7), ("a", 0.5), ("d", 0.1)])
+
+        results = unique(self.documents, lambda x: x.document.id, k=2)
+        self.assertEqual([e.document.id for e in results], ["b", "c"])
+
+    def test_take_unique(self):
+        keys = []
+
+        def get_key(x: ScoredDocument):
+            keys.append(x.document.id)
+            return x.document.id
+
+        results = take_unique(iter(self.documents), get_key, k=2)
+        self.assertEqual([e.score for e in results], [0.2, 0.9])
+        self.assertEqual(keys, ["a", "b"])
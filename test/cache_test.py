@@ -0,0 +1,80 @@
+from tempfile import mkdtemp
+from typing import List, Union
+from unittest import TestCase
+
+from localsearch.__spi__ import Document, Encoder
+from localsearch.__spi__.types import CrossEncoder, TextPair, Vector
+from localsearch.cache import CachedCrossEncoder, CachedEncoder, CachedSearcher, LRUCache
+from localsearch.pipeline import SearchPipeline
+from localsearch.searcher.annoy_search import AnnoyConfig, AnnoySearch
+
+
+class DummyEncoder(Encoder):
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_output_dim(self) -> int:
+        return 100
+
+    def __call__(self, texts: Union[str, List[str]]) -> Vector:
+        import numpy as np
+
+        self.calls += 1
+        if isinstance(texts, list):
+            return np.ones((len(texts), 100))
+        return np.ones(100)
+
+
+class DummyCrossEncoder(CrossEncoder):
+
+    def __init__(self):
+        self.pairs = 0
+
+    def __call__(self, texts: Union[TextPair, List[TextPair]]) -> Vector:
+        import numpy as np
+
+        self.pairs += len(texts)
+        return np.ones(len(texts))
+
+
+class CacheTest(TestCase):
+
+    def test_lru_cache(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats().hits, 2)
+        self.assertEqual(cache.stats().misses, 1)
+
+        cache.delete("a")
+        cache.delete("x")
+        self.assertEqual(len(cache), 1)
+
+        cache = LRUCache(ttl=0)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), None)
+
+    def test_cached_pipeline(self):
+        encoder = DummyEncoder()
+        cross_encoder = CachedCrossEncoder(DummyCrossEncoder())
+        searcher = CachedSearcher(AnnoySearch(AnnoyConfig(path=mkdtemp()), CachedEncoder(encoder)))
+        searcher.append([Document(f"abcd{i}", "source", {"text": f"Beispiel Text {i}"}) for i in range(3)])
+
+        pipeline = SearchPipeline([searcher], cross_encoder)
+        self.assertEqual(len(pipeline.search("Beispiel")), 3)
+        self.assertEqual(len(pipeline.search("Beispiel")), 3)
+
+        self.assertEqual(encoder.calls, 2)
+        self.assertEqual(len(searcher.searcher.encoder.cache), 1)
+        self.assertEqual(cross_encoder.cross_encoder.pairs, 3)
+        self.assertEqual(searcher.cache.stats().hits, 1)
+
+        searcher.remove("abcd1")
+        self.assertEqual(len(pipeline.search("Beispiel")), 2)
+        self.assertEqual(encoder.calls, 2)
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from localsearch.__spi__ import Document
+from localsearch.document_store import FileSystemDocumentStore, RecordLogDocumentStore, SqliteDocumentStore, migrate
+
+
+class SqliteDocumentStoreTest(TestCase):
+
+    # noinspection PyMethodMayBeStatic
+    def test_lookup(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        store = SqliteDocumentStore(tempdir + "/documents.db")
+        store.put_many([
+            (0, Document("abcd1", "source1", {"text": "Beispiel Text"})),
+            (1, Document("abcd2", "source1", {"text": "Beispiel Text"})),
+            (2, Document("abcd3", "source2", {"text": "Beispiel Text"})),
+        ])
+
+        assert store.get(1).id == "abcd2"
+        assert store.get_many([2, 5])[1] is None
+        assert store.ids_by_document("abcd3") == [2]
+        assert len(store.get_by_source("source1")) == 2
+
+        store.delete_many(store.ids_by_source("source1"))
+        assert store.ids() == [2]
+
+
+class RecordLogDocumentStoreTest(TestCase):
+
+    # noinspection PyMethodMayBeStatic
+    def test_lookup(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        store = RecordLogDocumentStore(tempdir, shard_size=100)
+        store.put_many([(i, Document(f"abcd{i}", f"source{i % 2}", {"text": "Beispiel Text"})) for i in range(5)])
+
+        assert store.get(3).id == "abcd3"
+        assert store.get(7) is None
+        assert store.ids_by_source("source1") == [1, 3]
+
+        store.delete_many([1])
+        store.put_many([(5, Document("abcd5", "source1", {"text": "Beispiel Text"}))])
+        assert store.ids_by_source("source1") == [3, 5]
+
+        # a second instance sees the same documents through the offset index
+        store = RecordLogDocumentStore(tempdir, readonly=True)
+        assert store.ids() == [0, 2, 3, 4, 5]
+        assert store.ids_by_document("abcd5") == [5]
+
+        self.assertRaises(ValueError, RecordLogDocumentStore, tempdir + "/missing", readonly=True)
+
+    # noinspection PyMethodMayBeStatic
+    def test_migrate(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        source = FileSystemDocumentStore(tempdir + "/json")
+        source.put_many([(i, Document(f"abcd{i}", "source", {"text": "Beispiel Text"})) for i in range(3)])
+
+        target = RecordLogDocumentStore(tempdir + "/jsonl")
+        assert migrate(source, target, batch_size=2) == 3
+        assert [e.id for e in target.get_many([0, 1, 2])] == ["abcd0", "abcd1", "abcd2"]
@@ -53,3 +53,15 @@ class SearchEnsembleTest(TestCase):
         ensemble.remove("abcd1")
         results = ensemble.read("Beispiel Text")
         assert len(results) == 6
+
+    def test_fusion(self):
+        from localsearch.fusion import ReciprocalRankFusion
+
+        ensemble = CustomEnsemble()
+        ensemble.fusion = ReciprocalRankFusion()
+        ensemble.append([Document(f"abcd{i}", "source", {"text": "Beispiel Text"}) for i in range(4)])
+
+        results = ensemble.read("Beispiel Text", n=3)
+        assert len(results) == 3
+        assert len({e.document.id for e in results}) == 3
+        assert [len(e) for e in ensemble.read_batch(["Beispiel", "Text"], n=2)] == [2, 2]
@@ -0,0 +1,36 @@
+from typing import List
+from unittest import TestCase
+
+from localsearch.__spi__ import Document, ScoredDocument
+from localsearch.fusion import CombMNZ, CombSUM, LinearFusion, ReciprocalRankFusion
+
+
+def to_result(scores: dict) -> List[ScoredDocument]:
+    return [ScoredDocument(score, Document(key, "source", {"text": key})) for key, score in scores.items()]
+
+
+class FusionTest(TestCase):
+    bm25 = to_result({"a": 12.0, "b": 8.0, "c": 2.0})
+    cosine = to_result({"c": 0.9, "d": 0.8, "b": 0.7})
+
+    def test_reciprocal_rank_fusion(self):
+        results = ReciprocalRankFusion()([self.bm25, self.cosine])
+        self.assertEqual([e.document.id for e in results], ["c", "b", "a", "d"])
+        self.assertAlmostEqual(results[0].score, 1 / 61 + 1 / 63)
+
+        results = ReciprocalRankFusion(weights=[0.0, 1.0])([self.bm25, self.cosine], n=2)
+        self.assertEqual([e.document.id for e in results], ["c", "d"])
+
+    def test_linear_fusion(self):
+        results = CombSUM()([self.bm25, self.cosine])
+        self.assertEqual([e.document.id for e in results], ["a", "c", "b", "d"])
+        self.assertAlmostEqual(results[0].score, 1.0)
+
+        results = CombMNZ()([self.bm25, self.cosine], n=2)
+        self.assertEqual([e.document.id for e in results], ["c", "b"])
+
+        results = LinearFusion("zscore", weights=[1.0, 2.0])([self.bm25, self.cosine], n=1)
+        self.assertEqual([e.document.id for e in results], ["c"])
+
+        with self.assertRaises(ValueError):
+            LinearFusion(weights=[1.0])([self.bm25, self.cosine])
@@ -0,0 +1,104 @@
+import os
+from unittest import TestCase
+
+from localsearch.__spi__ import Document
+from localsearch.searcher import NetworkxSearch
+
+
+class NetworkxSearchTest(TestCase):
+
+    def test_lookups(self):
+        search = NetworkxSearch()
+        search.append([
+            Document("a", "source", {"type": "person", "text": "Alice"}),
+            Document("b", "source", {"type": "person", "text": "Bob"}),
+            Document("c", "source", {"text": "untyped"})
+        ])
+        search.add_node("d", {"type": "company", "text": "ACME"})
+        search.add_edge("a", "b", "knows")
+        search.add_edge("a", "d", "works_at")
+
+        self.assertEqual(search.search_by_id("a")["text"], "Alice")
+        self.assertIsNone(search.search_by_id("x"))
+        self.assertEqual([e and e["text"] for e in search.search_by_ids(["d", "x"])], ["ACME", None])
+        self.assertEqual([e["text"] for e in search.search_by_type("person")], ["Alice", "Bob"])
+
+        self.assertEqual(len(search.get_edges("a")), 2)
+        self.assertEqual([e["type"] for e in search.get_edges("d", "works_at")], ["works_at"])
+
+        search.add_node("b", {"type": "bot"})
+        search.add_edge("a", "d", "owns")
+        self.assertEqual([e["text"] for e in search.search_by_type("person")], ["Alice"])
+        self.assertEqual(search.get_edges("a", "works_at"), [])
+
+        search.remove("d")
+        self.assertEqual(search.search_by_type("company"), [])
+        self.assertEqual(search.get_edges("a", "owns"), [])
+        self.assertEqual(len(search.get_edges("a")), 1)
+
+    def test_read(self):
+        from localsearch.__spi__ import Reader, ScoredDocument
+        from localsearch.searcher.networkx_search import NetworkxConfig
+
+        config = NetworkxConfig(hops=2, decay=0.5, edge_weights={"knows": 1.0, "works_at": 0.4})
+        search = NetworkxSearch(config=config)
+        search.append([Document(e, "source", {"type": "entity", "text": e}) for e in ["alice", "bob", "carol", "acme"]])
+        search.add_edge("alice", "bob", "knows")
+        search.add_edge("bob", "carol", "knows")
+        search.add_edge("alice", "acme", "works_at")
+
+        results = search.read("who is alice")
+        self.assertEqual([e.document.id for e in results], ["bob", "carol", "acme"])
+        self.assertAlmostEqual(results[0].score, 0.5 / 3)
+        self.assertEqual(results[0].document.index, "networkx")
+        self.assertEqual(results[0].document.source, "source")
+        self.assertEqual(results[0].document.fields, {"type": "entity", "text": "bob"})
+        self.assertEqual(search.search_by_id("bob"), {"type": "entity", "text": "bob"})
+
+        search.append(Document("dave", "doc", {"text": "dave", "source": "field"}))
+        search.add_edge("dave", "alice", "knows")
+        dave = next(e.document for e in search.read("alice", n=10) if e.document.id == "dave")
+        self.assertEqual((dave.id, dave.source, dave.fields["source"]), ("dave", "doc", "field"))
+        search.remove("dave")
+
+        class SeedReader(Reader):
+            def read(self, text: str, n=None):
+                return [ScoredDocument(1.0, Document("carol", "source", {}))]
+
+        search.seed_readers = [SeedReader()]
+        self.assertEqual([e.document.id for e in search.read("anything", n=1)], ["bob"])
+
+        search.remove("bob")
+        self.assertEqual(search.read("anything"), [])
+
+    def test_snapshot(self):
+        from tempfile import mkdtemp
+
+        path = mkdtemp() + "/graph"
+        search = NetworkxSearch(path)
+        search.append([Document(e, "source", {"type": "entity", "text": e, "rank": i}) for i, e in enumerate("abcd")])
+        search.add_edge("a", "b", "knows")
+        search.add_edge("c", "b", "knows")
+        search.add_edge("a", "d", "works_at")
+        search.save()
+
+        search.add_node("e", {"type": "entity", "text": "e"})
+        search.add_edge("e", "a", "knows")
+        search.remove("d")
+
+        loaded = NetworkxSearch(path)
+        self.assertEqual(sorted(loaded.graph.nodes), ["a", "b", "c", "e"])
+        self.assertEqual(loaded.search_by_id("c")["rank"], 2)
+        self.assertEqual(loaded.get_edges("b", "knows")[1], {"source_id": "c", "target_id": "b", "type": "knows"})
+        self.assertEqual(len(loaded.search_by_type("entity")), 4)
+
+        loaded.save()
+        reloaded = NetworkxSearch(path)
+        self.assertIsNotNone(reloaded._snapshot)
+        self.assertEqual([e.document.id for e in reloaded.read("e", n=2)], ["a", "b"])
+        self.assertEqual(sorted(reloaded.graph.edges), sorted(loaded.graph.edges))
+
+        graphml = NetworkxSearch(mkdtemp() + "/new.graphml")
+        graphml.add_node("a", {"text": "a"})
+        self.assertIsNone(graphml._log)
+        self.assertFalse(os.path.exists(graphml.path))
@@ -0,0 +1,94 @@
+from typing import Union, List
+from unittest import TestCase
+
+import numpy as np
+
+from localsearch.__spi__ import Document, Encoder
+from localsearch.__spi__.types import Vector
+from localsearch.searcher.numpy_search import NumpySearch, NumpyConfig
+from localsearch.searcher.quantization import inner_products
+
+
+class LengthEncoder(Encoder):
+
+    def get_output_dim(self) -> int:
+        return 2
+
+    def __call__(self, texts: Union[str, List[str]]) -> Vector:
+        if isinstance(texts, list):
+            return np.array([self(e) for e in texts])
+        return np.array([1.0, len(texts)])
+
+
+class NumpySearchTest(TestCase):
+
+    # noinspection PyMethodMayBeStatic
+    def test_semantic_search(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        config = NumpyConfig(path=tempdir, initial_capacity=2)
+        searcher = NumpySearch(config, LengthEncoder())
+        searcher.append([Document(f"abcd{i}", "source", {"text": "a" * i}) for i in range(5)])
+        searcher.append(Document("abcd5", "other", {"text": "a" * 5}))
+
+        results = searcher.read("aaa", n=2)
+        assert [e.document.id for e in results] == ["abcd3", "abcd4"]
+        assert abs(results[0].score - 1.0) < 1e-6
+
+        searcher.remove("abcd3")
+        searcher.remove_by_source("other")
+        assert [e.document.id for e in searcher.read("aaa", n=2)] == ["abcd4", "abcd2"]
+
+        readonly = NumpySearch(config, LengthEncoder(), readonly=True)
+        assert [[e.document.id for e in r] for r in readonly.read_batch(["aaa", ""], n=1)] == [["abcd4"], ["abcd0"]]
+        assert len(readonly.read("aaa", n=10)) == 4
+        with self.assertRaises(ValueError):
+            readonly.append(Document("abcd6", "source", {"text": "a"}))
+
+    def test_float16(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        searcher = NumpySearch(NumpyConfig(path=tempdir, dtype="float16", store_format="jsonl"), LengthEncoder())
+        searcher.append([Document(f"abcd{i}", "source", {"text": "a" * i}) for i in range(5)])
+
+        assert searcher.vectors.dtype == np.float16
+        assert searcher.read("aaaa", n=1)[0].document.id == "abcd4"
+
+        queries = np.random.default_rng(0).random((3, 8), dtype=np.float32)
+        vectors = np.random.default_rng(1).random((10, 8)).astype(np.float16)
+        expected = queries @ vectors.astype(np.float32).T
+        assert np.allclose(inner_products(queries, vectors, chunk_size=3), expected)
+
+    def test_quantization(self):
+        import tempfile
+        from uuid import uuid4
+        tempdir = tempfile.gettempdir() + "/" + str(uuid4())
+
+        for quantization in ["int8", "pq"]:
+            config = NumpyConfig(
+                path=tempdir, index_name=quantization, quantization=quantization, pq_subvectors=2, pq_min_train_size=5
+            )
+            searcher = NumpySearch(config, LengthEncoder())
+            searcher.append([Document(f"abcd{i}", "source", {"text": "a" * i}) for i in range(4)])
+            assert searcher.quantizer.trained == (quantization == "int8")
+            searcher.append([Document(f"abcd{i}", "source", {"text": "a" * min(i, 5)}) for i in range(4, 6)])
+            assert searcher.quantizer.trained
+
+            results = NumpySearch(config, LengthEncoder(), readonly=True).read("aaa", n=2)
+            assert [e.document.id for e in results] == ["abcd3", "abcd4"]
+            assert abs(results[0].score - 1.0) < 1e-6
+
+        config = NumpyConfig(path=tempdir, index_name="empty", quantization="pq", pq_subvectors=2)
+        self.assertRaises(ValueError, NumpySearch(config, LengthEncoder()).train_quantizer)
+
+    def test_quantization_benchmark(self):
+        from localsearch.benchmark import run_quantization_benchmark
+
+        results = run_quantization_benchmark(n=1000, dim=32, n_queries=10, pq_subvectors=[8])
+        assert [e.method for e in results] == ["float32", "int8", "pq8"]
+        assert results[1].memory * 4 == results[0].memory
+        assert results[1].rescored_recall > 0.9
@@ -1,14 +1,28 @@
 import os
 from tempfile import mkdtemp
-from typing import List, Union
+from typing import List, Optional, Union
 from unittest import TestCase
 
-from localsearch.__spi__ import Document
+from localsearch.__spi__ import Document, Encoder, Reader, ScoredDocument
 from localsearch.__spi__.types import CrossEncoder, TextPair, Vector
 from localsearch.pipeline import IndexPipeline, SearchPipeline
+from localsearch.searcher.annoy_search import AnnoyConfig, AnnoySearch
 from localsearch.searcher.tantivy_search import TantivyConfig, TantivySearch
 
 
+class DummyEncoder(Encoder):
+
+    def get_output_dim(self) -> int:
+        return 100
+
+    def __call__(self, texts: Union[str, List[str]]) -> Vector:
+        import numpy as np
+
+        if isinstance(texts, list):
+            return np.ones((len(texts), 100))
+        return np.ones(100)
+
+
 class DummyCrossEncoder(CrossEncoder):
 
     def __call__(self, texts: Union[TextPair, List[TextPair]]) -> Vector:
@@ -16,6 +30,34 @@ class DummyCrossEncoder(CrossEncoder):
         return np.ones(len(texts))
 
 
+class SlowReader(Reader):
+
+    def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
+        import time
+        time.sleep(1)
+        return []
+
+
+class StaticReader(Reader):
+
+    def __init__(self, ids: List[str]):
+        self.ids = ids
+
+    def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
+        return [ScoredDocument(1.0, Document(e, "source", {"text": e})) for e in self.ids]
+
+
+class RecordingCrossEncoder(CrossEncoder):
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts: Union[TextPair, List[TextPair]]) -> Vector:
+        import numpy as np
+        self.calls.append(len(texts))
+        return np.array([1.0 if text.startswith("good") else 0.0 for _, text in texts])
+
+
 class PipelineTest(TestCase):
 
     # noinspection PyMethodMayBeStatic
@@ -52,3 +94,110 @@ class PipelineTest(TestCase):
         pipeline.add(docs)
 
         self.assertEqual(len(os.listdir(tmp_dir)), 5)
+
+    def test_search_batch(self):
+        searcher = AnnoySearch(AnnoyConfig(path=mkdtemp()), DummyEncoder())
+        searcher.append([Document(f"abcd{i}", "source", {"text": f"Beispiel Text {i}"}) for i in range(3)])
+
+        pipeline = SearchPipeline([searcher], DummyCrossEncoder())
+        results = pipeline.search_batch(["Beispiel", "Text"])
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual([len(e) for e in results], [3, 3])
+
+    def test_duck_typed_reader(self):
+        class ReadOnlyReader:
+            def read(self, text: str, n: Optional[int] = None) -> List[ScoredDocument]:
+                return [ScoredDocument(1.0, Document(text, "source", {"text": text}))]
+
+        pipeline = SearchPipeline([ReadOnlyReader()])
+        results = pipeline.search_batch(["a", "b"])
+        self.assertEqual([[e.document.id for e in r] for r in results], [["a"], ["b"]])
+
+    def test_parallel_search_with_timeout(self):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        searcher = AnnoySearch(AnnoyConfig(path=mkdtemp()), DummyEncoder())
+        searcher.append([Document(f"abcd{i}", "source", {"text": f"Beispiel Text {i}"}) for i in range(3)])
+
+        executor = ThreadPoolExecutor(max_workers=4)
+        pipeline = SearchPipeline([searcher, SlowReader()], DummyCrossEncoder(), executor, timeouts=[None, 0.1])
+
+        self.assertEqual(len(pipeline.search("Beispiel Text")), 3)
+        self.assertEqual(len(asyncio.run(pipeline.asearch("Beispiel Text"))), 3)
+
+    def test_rerank_budget(self):
+        from localsearch.pipeline import SearchConfig
+
+        readers = [StaticReader(["good1", "bad1", "good2", "bad2"]), StaticReader(["bad2", "good2", "bad3"])]
+        reranker = RecordingCrossEncoder()
+        pipeline = SearchPipeline(readers, reranker)
+
+        results = pipeline.search("query", config=SearchConfig(n=5, rerank_top_k=3, rerank_batch_size=2))
+        self.assertEqual(reranker.calls, [2, 1])
+        self.assertEqual([e.document.id for e in results], ["good2", "good1"])
+
+        reranker.calls.clear()
+        config = SearchConfig(n=1, rerank_batch_size=2, rerank_cascade=True)
+        results = pipeline.search_batch(["query", "other"], config=config)
+        self.assertEqual(reranker.calls, [4])
+        self.assertEqual([[e.document.id for e in r] for r in results], [["good1"], ["good1"]])
+
+    def test_fusion_without_reranker(self):
+        from localsearch.fusion import ReciprocalRankFusion
+        from localsearch.pipeline import SearchConfig
+
+        readers = [StaticReader(["a", "b", "c"]), StaticReader(["c", "d"])]
+        pipeline = SearchPipeline(readers)
+
+        config = SearchConfig(n=3, fusion=ReciprocalRankFusion(weights=[1.0, 2.0]))
+        results = pipeline.search("query", config=config)
+        self.assertEqual([e.document.id for e in results], ["c", "d", "a"])
+
+    def test_index_pipeline_with_generator(self):
+        searcher = AnnoySearch(AnnoyConfig(path=mkdtemp()), DummyEncoder())
+
+        tmp_dir = mkdtemp()
+        pipeline = IndexPipeline(tmp_dir, [searcher])
+
+        docs = (Document(f"abcd{i}", "source", {"text": "Beispiel Text"}) for i in range(5))
+        pipeline.add(docs, batch_size=2)
+        pipeline.add(Document("abcd5", "source", {"text": "Beispiel Text"}))
+
+        self.assertEqual(sorted(os.listdir(tmp_dir)), [f"{i}.json" for i in range(6)])
+        self.assertEqual(len(searcher.read("Beispiel Text", n=10)), 6)
+
+    def test_index_pipeline_lists_raw_data_dir_once(self):
+        from unittest.mock import patch
+
+        tmp_dir = mkdtemp()
+        pipeline = IndexPipeline(tmp_dir, [AnnoySearch(AnnoyConfig(path=mkdtemp()), DummyEncoder())])
+        with patch("localsearch.document_store.file_system_document_store.os.listdir", wraps=os.listdir) as listdir:
+            pipeline.add([Document(f"abcd{i}", "source", {"text": "Beispiel Text"}) for i in range(10)], batch_size=1)
+        self.assertEqual(listdir.call_count, 0)
+        self.assertEqual(len(os.listdir(tmp_dir)), 10)
+
+    def test_index_pipeline_with_record_log(self):
+        tmp_dir = mkdtemp()
+        searcher = AnnoySearch(AnnoyConfig(path=mkdtemp(), raw_data_dir=tmp_dir, raw_data_format="jsonl"), DummyEncoder())
+        with IndexPipeline(tmp_dir, [searcher], raw_data_format="jsonl") as pipeline:
+            pipeline.add([Document(f"abcd{i}", "source", {"text": "Beispiel Text"}) for i in range(5)], batch_size=2)
+
+        results = searcher.read("Beispiel Text", n=10)
+        self.assertEqual(sorted(e.document.id for e in results), [f"abcd{i}" for i in range(5)])
+
+    def test_index_pipeline_remove_and_append(self):
+        for segmented in [False, True]:
+            tmp_dir = mkdtemp()
+            config = AnnoyConfig(path=mkdtemp(), raw_data_dir=tmp_dir, segmented=segmented)
+            searcher = AnnoySearch(config, DummyEncoder())
+            pipeline = IndexPipeline(tmp_dir, [searcher])
+
+            pipeline.add([Document(f"d{i}", "source", {"text": "Beispiel Text"}) for i in range(5)])
+            searcher.remove("d4")
+            pipeline.add(Document("d5", "source", {"text": "Beispiel Text"}))
+
+            results = searcher.read("Beispiel Text", n=10)
+            self.assertEqual(sorted(e.document.id for e in results), ["d0", "d1", "d2", "d3", "d5"])
+            self.assertEqual(searcher.store.ids_by_document("d5"), [5])
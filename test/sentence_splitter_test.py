@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from localsearch.__spi__ import Document
+from localsearch.searcher.splitter import SentenceSplitter
+from localsearch.searcher.splitter.sentence_splitter import PrefixAwareTextMerger
+
+text = "This is the first sentence. This is the second one. A third follows. And a fourth. The fifth ends it."
+
+
+class SentenceSplitterTest(TestCase):
+
+    def test_split(self):
+        splitter = SentenceSplitter(chunk_size=2, window_size=1)
+        chunks = splitter(Document("abcd", "source", {"text": text, "title": "Title"}))
+
+        self.assertEqual([e.id for e in chunks], [f"abcd#{i}" for i in range(5)])
+        self.assertEqual(chunks[0].fields["title"], "Title")
+        for e in chunks:
+            start = e.fields["text_start_idx"]
+            self.assertTrue(text[start:].startswith(e.fields["text"].split(".")[0]))
+
+    def test_text_merger(self):
+        splitter = SentenceSplitter(chunk_size=2, window_size=0, text_merger=PrefixAwareTextMerger("#"))
+        chunks = splitter(Document("abcd", "source", {"text": "# Header\n" + text}))
+
+        self.assertTrue(all(e.fields["text"].startswith("# Header\n") for e in chunks))
+
+    def test_split_many(self):
+        splitter = SentenceSplitter(chunk_size=2, window_size=1)
+        documents = [Document(f"abcd{i}", "source", {"text": text}) for i in range(4)]
+
+        expected = [e for d in documents for e in splitter(d)]
+        self.assertEqual(list(splitter.split_many(iter(documents))), expected)
+        self.assertEqual(list(splitter.split_many(documents, workers=2, batch_size=3)), expected)
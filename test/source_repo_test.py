@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+from localsearch.__spi__.model import IndexedDocument, RankedDocument, SourcePart, StructuredSource, TextSource
+from localsearch.source_repo import CachedSourceRepo, FileSystemSourceRepo, SqliteSourceRepo
+from localsearch.source_repo.utils import filter_common_context, filter_common_context_batch, get_full_contexts
+
+
+def ranked(source_id: str, source_part: int, text_start_idx: int) -> RankedDocument:
+    fields = {"source_id": source_id, "source_part": source_part, "text_start_idx": text_start_idx}
+    document = IndexedDocument(f"{source_id}/{source_part}/{text_start_idx}", "source", fields, "index")
+    return RankedDocument(1.0, document, 1.0)
+
+
+class SourceRepoUtilsTest(TestCase):
+
+    def test_filter_common_context(self):
+        results = [
+            ranked("a", 0, 100),
+            ranked("a", 0, 140),  # 100 - 100 < 140 < 100 + 50
+            ranked("a", 1, 140),  # another part of the same source
+            ranked("b", 0, 120),
+            ranked("a", 0, 0),
+            ranked("a", 0, 60),  # 100 - 100 < 60 < 100 + 50
+            ranked("a", 0, 150)
+        ]
+
+        filtered = filter_common_context(results, chars_before=100, chars_after=50)
+        self.assertEqual([e.document.id for e in filtered], ["a/0/100", "a/1/140", "b/0/120", "a/0/0", "a/0/150"])
+
+    def test_filter_common_context_batch(self):
+        results = [[ranked("a", 0, 100), ranked("a", 0, 110)], [ranked("a", 0, 110)]]
+
+        filtered = filter_common_context_batch(results, chars_before=100, chars_after=50)
+        self.assertEqual([[e.document.id for e in r] for r in filtered], [["a/0/100"], ["a/0/110"]])
+
+
+class SourceRepoTest(TestCase):
+    sources = [
+        StructuredSource("a", "Title", [SourcePart("first part", "First"), SourcePart("second part", fields={"x": 1})]),
+        TextSource("b", "plain text")
+    ]
+
+    def test_sqlite_source_repo(self):
+        from tempfile import mkdtemp
+
+        repo = SqliteSourceRepo(mkdtemp() + "/sources.db")
+        [repo.add(e) for e in self.sources]
+
+        self.assertEqual(repo.get_many(["b", "a"]), list(reversed(self.sources)))
+        self.assertEqual(repo.get_part("a", 1), SourcePart("second part", fields={"x": 1}))
+        with self.assertRaises(KeyError):
+            repo.get("c")
+        self.assertEqual(repo.get_title("a"), "Title")
+
+        repo.get_many = None  # the contexts are resolved through get_part and get_title
+        contexts = get_full_contexts([ranked("a", 1, 0), ranked("a", 0, 0)], repo, chars_before=0, chars_after=6)
+        self.assertEqual(contexts, [
+            "Document title: Title.\n\nsecond",
+            "Document title: Title.\n\nSection title: First.\n\nfirst "
+        ])
+        del repo.get_many
+
+        repo.add(StructuredSource("a", "Title", [SourcePart("replaced")]))
+        self.assertEqual(repo.get("a").parts, [SourcePart("replaced")])
+
+    def test_cached_source_repo(self):
+        from tempfile import mkdtemp
+
+        class CountingRepo(FileSystemSourceRepo):
+            calls = 0
+
+            def get_many(self, ids):
+                self.calls += 1
+                return super().get_many(ids)
+
+        repo = CountingRepo(mkdtemp())
+        cached = CachedSourceRepo(repo)
+        [cached.add(e) for e in self.sources]
+
+        self.assertEqual(cached.get_many(["a", "b", "a"]), [self.sources[0], self.sources[1], self.sources[0]])
+        self.assertEqual(cached.get("a"), self.sources[0])
+        self.assertEqual(cached.get_part("a", 0).text, "first part")
+        self.assertEqual(repo.calls, 1)
+
+        cached.cache.clear()
+        self.assertEqual(cached.get_part("a", 1).text, "second part")
+        self.assertEqual(cached.get_part("a", 0).text, "first part")
+        self.assertEqual(repo.calls, 2)
+        for id, part in [("a", 2), ("b", 0)]:
+            with self.assertRaises(KeyError):
+                cached.get_part(id, part)
+
+        results = [ranked("a", 1, 7), ranked("a", 0, 0)]
+        contexts = get_full_contexts(results, cached, chars_before=3, chars_after=4)
+        self.assertEqual(contexts, [
+            "Document title: Title.\n\nnd part",
+            "Document title: Title.\n\nSection title: First.\n\nfirs"
+        ])
+
+        small = CachedSourceRepo(repo, max_bytes=300)
+        small.get_many(["a", "b"])
+        self.assertEqual(len(small.cache), 1)
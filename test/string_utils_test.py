@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+from localsearch.__util__.string_utils import Canonicalizer, get_segmenter, lemmatize, remove_punctuation, remove_stopwords
+
+
+class StringUtilsTest(TestCase):
+
+    def test_canonicalizer(self):
+        def canonicalize(text: str):
+            text = lemmatize(remove_stopwords(remove_punctuation(text), "de"), "de")
+            for e in "+-^`:{}\"[]()~!*\\":
+                text = text.replace(e, " ")
+            return text
+
+        texts = [
+            "Das ist ein Beispiel Text!",
+            "Die Häuser, die (Bäume) [x] {y} a+b-c ^d `e` f:g ~h *i \\j \"k\"?",
+            "  mehrere  Leerzeichen  ",
+            ""
+        ]
+
+        canonicalizer = Canonicalizer("de")
+        self.assertEqual(canonicalizer.canonicalize_many(texts), [canonicalize(e) for e in texts])
+
+    def test_segmenter_per_thread(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            segmenters = list(executor.map(lambda _: get_segmenter("en"), range(2)))
+        self.assertIs(get_segmenter("en"), get_segmenter("en"))
+        self.assertIsNot(get_segmenter("en"), segmenters[0])
+
+        text = "First sentence.  Second one!"
+        self.assertEqual([(e.sent, e.start) for e in get_segmenter("en").segment(text)],
+                         [("First sentence.  ", 0), ("Second one!", 17)])
@@ -41,3 +41,45 @@ class TantivySearcherTest(TestCase):
         results = searcher.read("Beispiel Text")
 
         assert len(results) == 0
+
+    # noinspection PyMethodMayBeStatic
+    def test_read_batch(self):
+        config = TantivyConfig(lang="de")
+        searcher = TantivySearch(config)
+
+        searcher.append(Document("abcd1", "source", {"text": "Beispiel Text"}))
+        searcher.append(Document("abcd2", "source", {"text": "Anderer Inhalt"}))
+
+        results = searcher.read_batch(["Beispiel", "Inhalt", "Unbekannt"])
+        assert [len(e) for e in results] == [1, 1, 0]
+        assert results[1][0].document.id == "abcd2"
+
+    # noinspection PyMethodMayBeStatic
+    def test_manual_reload_policy(self):
+        config = TantivyConfig(lang="de", reload_policy="manual")
+        searcher = TantivySearch(config)
+
+        searcher.append(Document("abcd1", "source", {"text": "Beispiel Text"}))
+        assert len(searcher.read("Beispiel Text")) == 1
+
+        searcher.append(Document("abcd2", "source", {"text": "Beispiel Text"}))
+        assert len(searcher.read("Beispiel Text")) == 1
+
+        searcher.refresh()
+        assert len(searcher.read("Beispiel Text")) == 2
+
+    # noinspection PyMethodMayBeStatic
+    def test_buffered_writer(self):
+        config = TantivyConfig(lang="de", buffered=True, commit_docs=3)
+        searcher = TantivySearch(config)
+
+        searcher.append(Document("abcd1", "source", {"text": "Beispiel Text"}))
+        searcher.append(Document("abcd2", "source", {"text": "Beispiel Text"}))
+        assert len(searcher.read("Beispiel Text")) == 0
+
+        searcher.remove("abcd1")
+        assert len(searcher.read("Beispiel Text")) == 1
+
+        searcher.append(Document("abcd3", "source", {"text": "Beispiel Text"}))
+        searcher.flush()
+        assert len(searcher.read("Beispiel Text")) == 2